@@ -13,59 +13,187 @@
 CUDA_ENABLED=True
 
 import ctypes as ct
+import functools
+import os
+import threading
+import weakref
 import numpy as np
 
 import matplotlib.pyplot as plt
 import matplotlib.cm as cm
-from matplotlib.colors import ListedColormap
-
-from huygens.interf import c_matrix,c_vector,c_pointer
+from matplotlib.colors import Normalize
+from PIL import Image
 
 __all__=['sample_mandelbrot','plot_mandelbrot','sample_newton','sample_newton_cuda','plot_newton','plot_newton_roots'
-  ,'plot_newton_iteration']
-
-# load the lib
-_libc=ct.cdll.LoadLibrary('./bin/fractal.dll')
-
-# extract the functions
-_sample_mandelbrot=getattr(_libc,'?sample_mandelbrot@@YAHPEAPEAHHHHHNNNN_N@Z')
-_sample_newton=getattr(_libc,'?sample_newton@@YAHPEAPEAN0PEAPEAHPEANHHHHHNNNN_N@Z')
-_assign_roots=getattr(_libc,'?assign_roots@@YAXQEAHQEBN111HHH@Z')
-
-# assign arg and return types
-_sample_mandelbrot.argtypes=[ct.POINTER(ct.POINTER(ct.c_int)),ct.c_int,ct.c_int,ct.c_int,ct.c_int,ct.c_double
-  ,ct.c_double,ct.c_double,ct.c_double,ct.c_bool]
-_sample_mandelbrot.restype=ct.c_int
-_sample_newton.argtypes=[ct.POINTER(ct.POINTER(ct.c_double)),ct.POINTER(ct.POINTER(ct.c_double)),ct.POINTER(ct.POINTER(ct.c_int))
-  ,ct.POINTER(ct.c_double),ct.c_int,ct.c_int,ct.c_int,ct.c_int,ct.c_int,ct.c_double,ct.c_double,ct.c_double,ct.c_double,ct.c_bool]
-_sample_newton.restype=ct.c_int
-_assign_roots.argtypes=[ct.POINTER(ct.c_int),ct.POINTER(ct.c_double),ct.POINTER(ct.c_double),ct.POINTER(ct.c_double)
-    ,ct.POINTER(ct.c_double),ct.c_int,ct.c_int,ct.c_int]
-_assign_roots.restype=None
+  ,'plot_newton_iteration','compose_newton_cuda','create_stream','destroy_stream','init_buffers','free_buffers']
+
+# the image formats PIL can write, which visualisations are saved to directly rather than through matplotlib
+# PIL only writes PDFs with lossy compression, so these are still left to matplotlib
+_PIL_EXTENSIONS={extension for extension,image_format in Image.registered_extensions().items() if image_format in Image.SAVE
+  and image_format!='PDF'}
+
+# load the lib, or leave Newton's fractals to Numba below if it has not been built
+try:
+  _libc=ct.cdll.LoadLibrary('./bin/fractal.dll')
+except OSError:
+  _libc=None
+
+if _libc is not None:
+  # extract the functions
+  _sample_mandelbrot=getattr(_libc,'?sample_mandelbrot@@YAHQEAGHHHHNNNN_N@Z')
+  _sample_newton=getattr(_libc,'?sample_newton@@YAHQEAN0QEAH1QEBN22HHHHHNNNN_N@Z')
+
+  # assign arg and return types
+  _sample_mandelbrot.argtypes=[ct.POINTER(ct.c_uint16),ct.c_int,ct.c_int,ct.c_int,ct.c_int,ct.c_double
+    ,ct.c_double,ct.c_double,ct.c_double,ct.c_bool]
+  _sample_mandelbrot.restype=ct.c_int
+  _sample_newton.argtypes=[ct.POINTER(ct.c_double),ct.POINTER(ct.c_double),ct.POINTER(ct.c_int),ct.POINTER(ct.c_int)
+    ,ct.POINTER(ct.c_double),ct.POINTER(ct.c_double),ct.POINTER(ct.c_double),ct.c_int,ct.c_int,ct.c_int,ct.c_int,ct.c_int,ct.c_double
+    ,ct.c_double,ct.c_double,ct.c_double,ct.c_bool]
+  _sample_newton.restype=ct.c_int
+
+# Newton's fractals are sampled with Numba if the library could not be loaded, or if FRACTAL_USE_NUMBA=1 is set
+NUMBA_ENABLED=_libc is None or os.environ.get('FRACTAL_USE_NUMBA','0')=='1'
+
+if NUMBA_ENABLED:
+  from numba import config,njit,prange,set_num_threads
+
+  # fastmath is not used, as it lets LLVM assume there are no infinities, which mark where no root was reached
+  @njit(parallel=True,cache=True)
+  def _sample_newton_numba(re,im,itr,ind,coeffs,roots_re,roots_im,max_itr,startx,starty,deltax,deltay,tol,limit):
+    '''
+    Internal function to find the root each number in a subset of the complex plane converges to with Newton's method, and the index of
+    that root, as the library's `sample_newton` does.
+
+    Parameters
+    ----------
+    re,im : 2D numpy.ndarray
+      - Arrays to write out the real and imaginary parts of the root reached, or infinity where no root was reached.
+    itr : 2D numpy.ndarray
+      - Array to write out the number of iterations taken to reach the root, or `limit` where no root was reached.
+    ind : 2D numpy.ndarray
+      - Array to write out the index of the closest root, or -1 where no root was reached.
+    coeffs : 1D numpy.ndarray
+      - The coefficients of the polynomial, in order from lowest to highest degree.
+    roots_re,roots_im : 1D numpy.ndarray
+      - The real and imaginary parts of the actual roots.
+    max_itr : int
+      - The number of iterations to compute before considering a point to not converge.
+    startx,starty : float
+      - The real and imaginary components of the bottom left corner of the area.
+    deltax,deltay : float
+      - The size of the step between pixels along each axis.
+    tol : float
+      - The tolerance within which a root is deemed to have been reached.
+    limit : int
+      - The value which represents no root was converged to.
+
+    '''
+    degree=coeffs.size-1
+    for row in prange(re.shape[0]):
+      imag=starty+deltay*row
+      for col in range(re.shape[1]):
+        x=complex(startx+deltax*col,imag)
+        itr[row,col]=limit
+        for n in range(max_itr):
+          # evaluate the value and derivative of the polynomial with Horner's method
+          p=complex(coeffs[degree],0.)
+          p_prime=0j
+          for k in range(degree-1,-1,-1):
+            p_prime=x*p_prime+p
+            p=x*p+coeffs[k]
+          # converged to a root
+          if abs(p)<tol:
+            itr[row,col]=n
+            break
+          # derivative is flat and we can't update
+          if p_prime==0:
+            break
+          x-=p/p_prime
+
+        if itr[row,col]==limit:
+          re[row,col]=np.inf
+          im[row,col]=np.inf
+          ind[row,col]=-1
+        else:
+          re[row,col]=x.real
+          im[row,col]=x.imag
+          # determine which root was reached while the result is still at hand
+          best=0
+          best_dist=np.inf
+          for k in range(roots_re.size):
+            dist=(x.real-roots_re[k])**2+(x.imag-roots_im[k])**2
+            if dist<best_dist:
+              best_dist=dist
+              best=k
+          ind[row,col]=best
+
+# the precisions the CUDA library can compute in, and their types
+_CUDA_PRECISIONS={'double':ct.c_double,'float':ct.c_float}
+
+class _CUDABuffers(ct.Structure):
+  '''
+  The leading members of the device memory kept between samples by the CUDA library, which describe what it can be used for.
+  '''
+  _fields_=[('xresolution',ct.c_int),('yresolution',ct.c_int),('degree',ct.c_int)]
 
 if CUDA_ENABLED:
   # load the cuda lib
   _libc_cuda=ct.cdll.LoadLibrary('./bin/cufractal.dll')
 
   # extract the functions
-  _sample_mandelbrot_cuda=getattr(_libc_cuda,'?sample_mandelbrot@@YAHQEAHHHHNNNN_N@Z')
-  _sample_julia_cuda=getattr(_libc_cuda,'?sample_julia@@YAHQEAHNNHHHNNNN_N@Z')
-  _sample_newton_cuda=getattr(_libc_cuda,'?sample_newton@@YAHQEAN0QEAHQEBNHHHHNNNN_N@Z')
-  _assign_roots_cuda=getattr(_libc_cuda,'?assign_roots@@YAXQEAHQEBN111HHH@Z')
+  _alloc_pinned=getattr(_libc_cuda,'?alloc_pinned@@YAPEAX_K@Z')
+  _free_pinned=getattr(_libc_cuda,'?free_pinned@@YAXQEAX@Z')
+  _create_stream=getattr(_libc_cuda,'?create_stream@@YAPEAUCUstream_st@@XZ')
+  _destroy_stream=getattr(_libc_cuda,'?destroy_stream@@YAXQEAUCUstream_st@@@Z')
+  _init_buffers=getattr(_libc_cuda,'?init_buffers@@YAPEAUcu_buffers@@HHH@Z')
+  _free_buffers=getattr(_libc_cuda,'?free_buffers@@YAXQEAUcu_buffers@@@Z')
+  _compose_newton_cuda=getattr(_libc_cuda,'?compose_newton@@YAHQEAEQEBH1QEBEHHHH_NQEAUCUstream_st@@QEAUcu_buffers@@@Z')
+  # the samplers are compiled in both double and single precision
+  _sample_mandelbrot_cuda={
+    'double':getattr(_libc_cuda,'?sample_mandelbrot@@YAHQEAHHHHNNNN_NQEAUCUstream_st@@QEAUcu_buffers@@@Z')
+    ,'float':getattr(_libc_cuda,'?sample_mandelbrot_f32@@YAHQEAHHHHNNNN_NQEAUCUstream_st@@QEAUcu_buffers@@@Z')
+  }
+  _sample_julia_cuda={
+    'double':getattr(_libc_cuda,'?sample_julia@@YAHQEAHNNHHHNNNN_NQEAUCUstream_st@@QEAUcu_buffers@@@Z')
+    ,'float':getattr(_libc_cuda,'?sample_julia_f32@@YAHQEAHNNHHHNNNN_NQEAUCUstream_st@@QEAUcu_buffers@@@Z')
+  }
+  _sample_newton_cuda={
+    'double':getattr(_libc_cuda,'?sample_newton@@YAHQEAN0QEAH1QEBN22HHHHNNNN_NQEAUCUstream_st@@QEAUcu_buffers@@@Z')
+    ,'float':getattr(_libc_cuda,'?sample_newton_f32@@YAHQEAM0QEAH1QEBN22HHHHNNNN_NQEAUCUstream_st@@QEAUcu_buffers@@@Z')
+  }
 
   # assign arg and return types
-  _sample_mandelbrot_cuda.argtypes=[ct.POINTER(ct.c_int),ct.c_int,ct.c_int,ct.c_int,ct.c_double,ct.c_double,ct.c_double,ct.c_double
-    ,ct.c_bool]
-  _sample_mandelbrot_cuda.restype=ct.c_int
-  _sample_julia_cuda.argtypes=[ct.POINTER(ct.c_int),ct.c_double,ct.c_double,ct.c_int,ct.c_int,ct.c_int,ct.c_double,ct.c_double,ct.c_double
-    ,ct.c_double,ct.c_bool]
-  _sample_julia_cuda.restype=ct.c_int
-  _sample_newton_cuda.argtypes=[ct.POINTER(ct.c_double),ct.POINTER(ct.c_double),ct.POINTER(ct.c_int),ct.POINTER(ct.c_double),ct.c_int
-    ,ct.c_int,ct.c_int,ct.c_int,ct.c_double,ct.c_double,ct.c_double,ct.c_double,ct.c_bool]
-  _sample_newton_cuda.restype=ct.c_int
-  _assign_roots_cuda.argtypes=[ct.POINTER(ct.c_int),ct.POINTER(ct.c_double),ct.POINTER(ct.c_double),ct.POINTER(ct.c_double)
-    ,ct.POINTER(ct.c_double),ct.c_int,ct.c_int,ct.c_int]
-  _assign_roots_cuda.restype=None
+  _alloc_pinned.argtypes=[ct.c_size_t]
+  _alloc_pinned.restype=ct.c_void_p
+  _free_pinned.argtypes=[ct.c_void_p]
+  _free_pinned.restype=None
+  _create_stream.argtypes=[]
+  _create_stream.restype=ct.c_void_p
+  _destroy_stream.argtypes=[ct.c_void_p]
+  _destroy_stream.restype=None
+  _init_buffers.argtypes=[ct.c_int,ct.c_int,ct.c_int]
+  _init_buffers.restype=ct.POINTER(_CUDABuffers)
+  _free_buffers.argtypes=[ct.POINTER(_CUDABuffers)]
+  _free_buffers.restype=None
+  _compose_newton_cuda.argtypes=[ct.POINTER(ct.c_uint8),ct.POINTER(ct.c_int),ct.POINTER(ct.c_int),ct.POINTER(ct.c_uint8),ct.c_int
+    ,ct.c_int,ct.c_int,ct.c_int,ct.c_bool,ct.c_void_p,ct.POINTER(_CUDABuffers)]
+  _compose_newton_cuda.restype=ct.c_int
+  for precision,c_type in _CUDA_PRECISIONS.items():
+    _sample_mandelbrot_cuda[precision].argtypes=[ct.POINTER(ct.c_int),ct.c_int,ct.c_int,ct.c_int,ct.c_double,ct.c_double,ct.c_double
+      ,ct.c_double,ct.c_bool,ct.c_void_p,ct.POINTER(_CUDABuffers)]
+    _sample_mandelbrot_cuda[precision].restype=ct.c_int
+    _sample_julia_cuda[precision].argtypes=[ct.POINTER(ct.c_int),ct.c_double,ct.c_double,ct.c_int,ct.c_int,ct.c_int,ct.c_double
+      ,ct.c_double,ct.c_double,ct.c_double,ct.c_bool,ct.c_void_p,ct.POINTER(_CUDABuffers)]
+    _sample_julia_cuda[precision].restype=ct.c_int
+    # the roots approached are written out in the precision of the computation
+    _sample_newton_cuda[precision].argtypes=[ct.POINTER(c_type),ct.POINTER(c_type),ct.POINTER(ct.c_int),ct.POINTER(ct.c_int)
+      ,ct.POINTER(ct.c_double),ct.POINTER(ct.c_double),ct.POINTER(ct.c_double),ct.c_int,ct.c_int,ct.c_int,ct.c_int,ct.c_double
+      ,ct.c_double,ct.c_double,ct.c_double,ct.c_bool,ct.c_void_p,ct.POINTER(_CUDABuffers)]
+    _sample_newton_cuda[precision].restype=ct.c_int
+
+# the largest degree of polynomial the CUDA library can sample, as its roots are passed to the kernel by value
+_MAX_DEGREE_CUDA=64
 
 class CUDAWarning(Exception):
   '''
@@ -73,6 +201,71 @@ class CUDAWarning(Exception):
   '''
   pass
 
+# the CUDA stream of each thread, so that samples from different threads run concurrently
+_streams=threading.local()
+
+def create_stream():
+  '''
+  Create a CUDA stream to compute samples on. Samples on different streams may run concurrently.
+
+  Returns
+  -------
+  stream : ctypes.c_void_p
+    - The stream, to be released with `destroy_stream`.
+
+  '''
+  if not CUDA_ENABLED: raise CUDAWarning('CUDA library has not been implemented.')
+  return ct.c_void_p(_create_stream())
+
+def destroy_stream(stream):
+  '''
+  Release a CUDA stream produced by `create_stream`.
+
+  Parameters
+  ----------
+  stream : ctypes.c_void_p
+    - The stream to release.
+
+  '''
+  if not CUDA_ENABLED: raise CUDAWarning('CUDA library has not been implemented.')
+  _destroy_stream(stream)
+
+def init_buffers(x_resolution,y_resolution,degree=0):
+  '''
+  Allocate device memory for CUDA samples of a given resolution to reuse, rather than each allocating and freeing its own.
+  
+  Parameters
+  ----------
+  x_resolution,y_resolution : int
+    - The resolution of the samples to compute in the memory.
+  degree : int, optional
+    - The largest degree of polynomial to be sampled with `sample_newton_cuda`. If 0, the memory can only be used by
+      `sample_mandelbrot_cuda` and `sample_julia_cuda`.
+
+  Returns
+  -------
+  buffers
+    - The device memory, to be released with `free_buffers`. It must not be used by two samples at once.
+
+  '''
+  if not CUDA_ENABLED: raise CUDAWarning('CUDA library has not been implemented.')
+  if degree>_MAX_DEGREE_CUDA:
+    raise ValueError('Polynomials of degree greater than {} cannot be sampled with CUDA.'.format(_MAX_DEGREE_CUDA))
+  return _init_buffers(ct.c_int(x_resolution),ct.c_int(y_resolution),ct.c_int(degree))
+
+def free_buffers(buffers):
+  '''
+  Release device memory produced by `init_buffers`.
+
+  Parameters
+  ----------
+  buffers
+    - The device memory to release.
+
+  '''
+  if not CUDA_ENABLED: raise CUDAWarning('CUDA library has not been implemented.')
+  _free_buffers(buffers)
+
 def plot_mandelbrot(iterations,limit,log=True,show_fig=False,save_fig=True,file_name='mandelbrot.pdf',fig_inches=(12,12),dpi=1200
   ,color_map=None):
   '''
@@ -92,6 +285,7 @@ def plot_mandelbrot(iterations,limit,log=True,show_fig=False,save_fig=True,file_
     - If the visualisation should be saved.
   file_name : string, optional
     - The name of the output.
+      If the visualisation is only saved, to an image format such as PNG, it is written at the resolution of the sample, without `dpi`.
   fig_inches : tuple, optional
     - The size of the figure.
   dpi : int, optional
@@ -100,25 +294,15 @@ def plot_mandelbrot(iterations,limit,log=True,show_fig=False,save_fig=True,file_
     - The colours to use in the visualisation.
 
   '''
-  _,ax=_plot_setup(fig_inches)
-
-  if log:
-    iterations=np.log(iterations)
-    limit=np.log(limit)
-  
   # black out where the limit could not be found (in the mandelbrot set)
-  # and set color map
-  masked_iterations=np.ma.masked_where(iterations==limit,iterations)
+  iterations=_prepare_iterations(iterations,limit,log)
+  
+  # set color map
   if color_map is None:
     color_map=cm.Spectral_r
   color_map.set_bad(color='black')
-  # produce the figure
-  ax.imshow(masked_iterations,cmap=color_map)
-
-  if show_fig:
-    plt.show()
-  if save_fig:
-    plt.savefig(file_name,dpi=dpi)
+  # produce the visualisation
+  _render(iterations,show_fig,save_fig,file_name,fig_inches,dpi,color_map)
 
 def sample_mandelbrot(central_point,x_span,y_span,x_resolution,y_resolution,max_itr,num_threads=1,verbose=False):
   '''
@@ -134,6 +318,7 @@ def sample_mandelbrot(central_point,x_span,y_span,x_resolution,y_resolution,max_
     - The number of pizels to divide the x- and y-axes into.
   max_itr : int
     - The number of iterations to compute before considering a point to not converge.
+      Must be less than 65535, as iteration counts are stored as 16-bit integers.
   num_threads : int, optional
     - The number of threads to execute on.
   verbose : bool, optional.
@@ -143,29 +328,33 @@ def sample_mandelbrot(central_point,x_span,y_span,x_resolution,y_resolution,max_
   -------
   itr : 2D numpy.ndarray
     - The number of iterations for a pixel exceed the bound.
+      Row 0 is the bottom of the sampled area, so [0,0] is its lower left corner; plot with `origin='lower'`.
   limit : int
     - The value which represents the bound was not exceeded.
 
   '''
+  if _libc is None:
+    raise OSError('The library could not be loaded, and only Newton\'s fractals can be sampled without it.')
+  if max_itr>=np.iinfo(np.uint16).max:
+    raise ValueError('`max_itr` must be less than {}'.format(np.iinfo(np.uint16).max))
   # input setup
   startx=central_point[0]-x_span/2.
   starty=central_point[1]-y_span/2.
   endx=central_point[0]+x_span/2.
   endy=central_point[1]+y_span/2.
-  # array to store the iteration count for each pixel
-  tmp,act=c_matrix(ct.c_int,y_resolution,x_resolution)
+  # array to store the iteration count for each pixel, which the library writes into directly
+  itr=_aligned_empty((y_resolution,x_resolution),np.uint16)
 
   # call the library function
   limit=_sample_mandelbrot(
-    tmp,ct.c_int(max_itr),ct.c_int(num_threads),ct.c_int(x_resolution),ct.c_int(y_resolution)
+    itr.ctypes.data_as(ct.POINTER(ct.c_uint16)),ct.c_int(max_itr),ct.c_int(num_threads),ct.c_int(x_resolution),ct.c_int(y_resolution)
     ,ct.c_double(startx),ct.c_double(endx),ct.c_double(starty),ct.c_double(endy),ct.c_bool(verbose)
   )
 
-  del tmp
-  # flip the rows because [startx,stary] is stored in [0,0]
-  return np.flipud(np.ctypeslib.as_array(act)),limit
+  return itr,limit
 
-def sample_mandelbrot_cuda(central_point,x_span,y_span,x_resolution,y_resolution,max_itr,verbose=False):
+def sample_mandelbrot_cuda(central_point,x_span,y_span,x_resolution,y_resolution,max_itr,verbose=False,stream=None
+  ,precision='double',buffers=None):
   '''
   Produce a sample of the Mandelbrot Set with CUDA acceleration.
   
@@ -181,34 +370,46 @@ def sample_mandelbrot_cuda(central_point,x_span,y_span,x_resolution,y_resolution
     - The number of iterations to compute before considering a point to not converge.
   verbose : bool, optional.
     - For verbose output.
+  stream : ctypes.c_void_p, optional
+    - The CUDA stream to compute on, from `create_stream`. By default, each thread computes on a stream of its own.
+  precision : string, optional
+    - The precision to compute in, one of: 'double', 'float'.
+      'float' is much faster on most GPUs, but is only suitable at lower zoom levels.
+  buffers : optional
+    - The device memory to compute in, from `init_buffers` with the same resolution. By default, device memory is allocated for this
+      sample only.
 
   Returns
   -------
   itr : 2D numpy.ndarray
     - The number of iterations for a pixel exceed the bound.
+      Row 0 is the bottom of the sampled area, so [0,0] is its lower left corner; plot with `origin='lower'`.
   limit : int
     - The value which represents the bound was not exceeded.
 
   '''
   if not CUDA_ENABLED: raise CUDAWarning('CUDA library has not been implemented.')
+  if precision not in _CUDA_PRECISIONS:
+    raise ValueError('`precision` must be one of {}'.format(list(_CUDA_PRECISIONS)))
   # input setup
   startx=central_point[0]-x_span/2.
   starty=central_point[1]-y_span/2.
   endx=central_point[0]+x_span/2.
   endy=central_point[1]+y_span/2.
   # array to store the iteration count for each pixel
-  itr=c_vector(ct.c_int,y_resolution*x_resolution)
+  itr=_pinned_array(ct.c_int,(y_resolution,x_resolution))
 
   # call the library function
-  limit=_sample_mandelbrot_cuda(
-    itr,ct.c_int(max_itr),ct.c_int(x_resolution),ct.c_int(y_resolution)
-    ,ct.c_double(startx),ct.c_double(endx),ct.c_double(starty),ct.c_double(endy),ct.c_bool(verbose)
+  limit=_sample_mandelbrot_cuda[precision](
+    itr.ctypes.data_as(ct.POINTER(ct.c_int)),ct.c_int(max_itr),ct.c_int(x_resolution),ct.c_int(y_resolution)
+    ,ct.c_double(startx),ct.c_double(endx),ct.c_double(starty),ct.c_double(endy),ct.c_bool(verbose),_cuda_stream(stream)
+    ,_cuda_buffers(buffers,x_resolution,y_resolution)
   )
 
-  # reshape into a 2D array and flip the rows because [startx,stary] is stored in [0,0]
-  return np.flipud(np.reshape(np.ctypeslib.as_array(itr),(y_resolution,x_resolution))),limit
+  return itr,limit
 
-def sample_julia_cuda(c,central_point,x_span,y_span,x_resolution,y_resolution,max_itr,verbose=False):
+def sample_julia_cuda(c,central_point,x_span,y_span,x_resolution,y_resolution,max_itr,verbose=False,stream=None
+  ,precision='double',buffers=None):
   '''
   Produce a sample of the Julia set of a given complex number with CUDA acceleration.
   
@@ -226,32 +427,43 @@ def sample_julia_cuda(c,central_point,x_span,y_span,x_resolution,y_resolution,ma
     - The number of iterations to compute before considering a point to not converge.
   verbose : bool, optional.
     - For verbose output.
+  stream : ctypes.c_void_p, optional
+    - The CUDA stream to compute on, from `create_stream`. By default, each thread computes on a stream of its own.
+  precision : string, optional
+    - The precision to compute in, one of: 'double', 'float'.
+      'float' is much faster on most GPUs, but is only suitable at lower zoom levels.
+  buffers : optional
+    - The device memory to compute in, from `init_buffers` with the same resolution. By default, device memory is allocated for this
+      sample only.
 
   Returns
   -------
   itr : 2D numpy.ndarray
     - The number of iterations for a pixel exceed the bound.
+      Row 0 is the bottom of the sampled area, so [0,0] is its lower left corner; plot with `origin='lower'`.
   limit : int
     - The value which represents the bound was not exceeded.
 
   '''
   if not CUDA_ENABLED: raise CUDAWarning('CUDA library has not been implemented.')
+  if precision not in _CUDA_PRECISIONS:
+    raise ValueError('`precision` must be one of {}'.format(list(_CUDA_PRECISIONS)))
   # input setup
   startx=central_point[0]-x_span/2.
   starty=central_point[1]-y_span/2.
   endx=central_point[0]+x_span/2.
   endy=central_point[1]+y_span/2.
   # array to store the iteration count for each pixel
-  itr=c_vector(ct.c_int,y_resolution*x_resolution)
+  itr=_pinned_array(ct.c_int,(y_resolution,x_resolution))
 
   # call the library function
-  limit=_sample_julia_cuda(
-    itr,ct.c_double(c.real),ct.c_double(c.imag),ct.c_int(max_itr),ct.c_int(x_resolution),ct.c_int(y_resolution)
-    ,ct.c_double(startx),ct.c_double(endx),ct.c_double(starty),ct.c_double(endy),ct.c_bool(verbose)
+  limit=_sample_julia_cuda[precision](
+    itr.ctypes.data_as(ct.POINTER(ct.c_int)),ct.c_double(c.real),ct.c_double(c.imag),ct.c_int(max_itr),ct.c_int(x_resolution)
+    ,ct.c_int(y_resolution),ct.c_double(startx),ct.c_double(endx),ct.c_double(starty),ct.c_double(endy),ct.c_bool(verbose)
+    ,_cuda_stream(stream),_cuda_buffers(buffers,x_resolution,y_resolution)
   )
 
-  # reshape into a 2D array and flip the rows because [startx,stary] is stored in [0,0]
-  return np.flipud(np.reshape(np.ctypeslib.as_array(itr),(y_resolution,x_resolution))),limit
+  return itr,limit
 
 
 def plot_newton_roots(roots,show_fig=False,save_fig=True,file_name='newtons_fractal_roots.pdf',fig_inches=(12,12),dpi=1200
@@ -269,26 +481,21 @@ def plot_newton_roots(roots,show_fig=False,save_fig=True,file_name='newtons_frac
     - If the visualisation should be saved.
   file_name : string, optional
     - The name of the output.
+      If the visualisation is only saved, to an image format such as PNG, it is written at the resolution of the sample, without `dpi`.
   fig_inches : tuple, optional
     - The size of the figure.
   dpi : int, optional
     - Plot resolution.
 
   '''
-  _,ax=_plot_setup(fig_inches)
-
   # black out where no root could be found and set color map
-  masked_roots=np.ma.masked_where(roots==-1,roots)
+  roots=roots.astype(np.float32)
+  roots[roots==-1]=np.nan
   if color_map is None:
     color_map=cm.viridis
   color_map.set_bad(color='black')
-  # produce the figure
-  ax.imshow(masked_roots,cmap=color_map)
-
-  if show_fig:
-    plt.show()
-  if save_fig:
-    plt.savefig(file_name,dpi=dpi)
+  # produce the visualisation
+  _render(roots,show_fig,save_fig,file_name,fig_inches,dpi,color_map)
 
 def plot_newton_iteration(iterations,limit,log=True,show_fig=False,save_fig=True,file_name='newtons_fractal_iterations.pdf'
   ,fig_inches=(12,12),dpi=1200,color_map=None):
@@ -309,32 +516,23 @@ def plot_newton_iteration(iterations,limit,log=True,show_fig=False,save_fig=True
     - If the visualisation should be saved.
   file_name : string, optional
     - The name of the output.
+      If the visualisation is only saved, to an image format such as PNG, it is written at the resolution of the sample, without `dpi`.
   fig_inches : tuple, optional
     - The size of the figure.
   dpi : int, optional
     - Plot resolution.
   
   '''
-  _,ax=_plot_setup(fig_inches)
-  
-  if log:
-    iterations=np.log(iterations)
-    limit=np.log(limit)
-
   # black out where no root could be found and set color map
-  masked_iterations=np.ma.masked_where(iterations==limit,iterations)
+  iterations=_prepare_iterations(iterations,limit,log)
   if color_map is None:
     color_map=cm.Spectral_r
   color_map.set_bad(color='black')
-  # produce the figure
-  ax.imshow(masked_iterations,cmap=color_map)
+  # produce the visualisation
+  _render(iterations,show_fig,save_fig,file_name,fig_inches,dpi,color_map)
 
-  if show_fig:
-    plt.show()
-  if save_fig:
-    plt.savefig(file_name,dpi=dpi)
-
-def plot_newton(roots,iterations,limit,colors,log=True,show_fig=False,save_fig=True,file_name='mandelbrot.pdf',fig_inches=(12,12),dpi=1200):
+def plot_newton(roots,iterations,limit,colors,log=True,show_fig=False,save_fig=True,file_name='mandelbrot.pdf',fig_inches=(12,12),dpi=1200
+  ,cuda=False):
   '''
   Produce a plot of Newton's fractals, coloured by the root converged to and the number of iterations taken.
   
@@ -347,7 +545,7 @@ def plot_newton(roots,iterations,limit,colors,log=True,show_fig=False,save_fig=T
   limit : int
     - The value which represents no root was converged to.
   colors : list
-    - List of colour scales to use for each root.
+    - List of colour scales to use for each root converged to, of which there must be at least one per root.
   log : bool, optional 
     - If the number of iterations should be logged.
   show_fig : bool, optional
@@ -356,36 +554,102 @@ def plot_newton(roots,iterations,limit,colors,log=True,show_fig=False,save_fig=T
     - If the visualisation should be saved.
   file_name : string, optional
     - The name of the output.
+      If the visualisation is only saved, to an image format such as PNG, it is written at the resolution of the sample, without `dpi`.
   fig_inches : tuple, optional
     - The size of the figure.
   dpi : int, optional
     - Plot resolution.
+  cuda : bool, optional
+    - If the image should be composited with CUDA acceleration, see `compose_newton_cuda`.
   
   '''
-  _,ax=_plot_setup(fig_inches)
-
-  # find all unique roots by the index values, ignoring where no root was found
-  unique_roots=np.unique(roots)
-  unique_roots=np.delete(unique_roots,np.where(unique_roots==-1))
+  if cuda:
+    rgba=compose_newton_cuda(roots,iterations,colors,log)
+  else:
+    # find all unique roots by the index values, ignoring where no root was found
+    unique_roots=np.unique(roots)
+    unique_roots=np.delete(unique_roots,np.where(unique_roots==-1))
+    _check_colors(len(unique_roots),colors)
+
+    # build the whole image at once, so that it is composited a single time
+    rgba=np.zeros(iterations.shape+(4,),dtype=np.float32)
+    # where no roots could be found is black
+    rgba[iterations==limit]=(0.,0.,0.,1.)
+    iterations=_prepare_iterations(iterations,limit,log)
+    # for each root, colour its pixels with its own colour scale
+    for itr,root in enumerate(unique_roots):
+      in_root=roots==root
+      values=iterations[in_root]
+      # a pixel which starts on a root takes 0 iterations, whose log is -inf, so it is shaded as if it took 1, as with CUDA
+      np.maximum(values,0.,out=values)
+      # shade by the square of the iterations, normalised across the pixels of this root only
+      values*=values
+      rgba[in_root]=colors[itr](Normalize(vmin=values.min(),vmax=values.max())(values))
+  _render(rgba,show_fig,save_fig,file_name,fig_inches,dpi)
+
+def compose_newton_cuda(roots,iterations,colors,log=True,stream=None,buffers=None):
+  '''
+  Produce an image of Newton's fractals with CUDA acceleration, coloured by the root converged to and the number of iterations taken, as
+  `plot_newton` does.
+  
+  Parameters
+  ----------
+  roots : 2D numpy.ndarray or None
+    - The index of the root which was found, or -1 if no root was found.
+      If None, along with `iterations`, the sample left in `buffers` by `sample_newton_cuda` is used without being copied to the device
+      again.
+  iterations : 2D numpy.ndarray or None
+    - The number of iterations for a pixel to converge to a root.
+  colors : list
+    - List of colour scales to use for each root converged to, of which there must be at least one per root.
+  log : bool, optional 
+    - If the number of iterations should be logged.
+  stream : ctypes.c_void_p, optional
+    - The CUDA stream to compute on, from `create_stream`. By default, each thread computes on a stream of its own.
+  buffers : optional
+    - The device memory to compute in, from `init_buffers` with the same resolution and a degree no less than the number of roots. By
+      default, device memory is allocated for this image only.
 
-  if log:
-    iterations=np.log(iterations)
-    limit=np.log(limit)
+  Returns
+  -------
+  rgba : 3D numpy.ndarray
+    - The colour of each pixel as 8-bit RGBA.
+      Row 0 is the bottom of the sampled area, so [0,0] is its lower left corner; plot with `origin='lower'`.
 
-  # mask where no roots could be found
-  limit_bool=iterations!=limit
-  # plot where no roots could be found as black
-  no_root=np.ma.masked_array(iterations,limit_bool)
-  ax.imshow(no_root,cmap=ListedColormap([0,0,0]))
-  # for each root, mask it and plot it
-  for itr,root in enumerate(unique_roots):
-    masked_roots=np.ma.masked_array(iterations,roots!=root)
-    ax.imshow(iterations*masked_roots,cmap=colors[itr])
+  '''
+  if not CUDA_ENABLED: raise CUDAWarning('CUDA library has not been implemented.')
+  if roots is None or iterations is None:
+    if roots is not None or iterations is not None or buffers is None:
+      raise ValueError('`roots` and `iterations` can only be omitted together, to compose the sample already in `buffers`')
+    # the sample is already on the device, with no root indexed beyond the degree the buffers were allocated for
+    y_resolution,x_resolution=buffers.contents.yresolution,buffers.contents.xresolution
+    num_roots=buffers.contents.degree
+    h_ind=h_itr=None
+  else:
+    y_resolution,x_resolution=iterations.shape
+    # the sample in library form, which it already is if it came from `sample_newton` or `sample_newton_cuda`
+    ind=np.ascontiguousarray(roots,dtype=np.intc)
+    itr=np.ascontiguousarray(iterations,dtype=np.intc)
+    # the roots are indexed from 0, so there are at least one more than the largest index converged to
+    num_roots=int(ind.max(initial=-1))+1
+    if num_roots>_MAX_DEGREE_CUDA:
+      raise ValueError('Polynomials of degree greater than {} cannot be composed with CUDA.'.format(_MAX_DEGREE_CUDA))
+    h_ind=ind.ctypes.data_as(ct.POINTER(ct.c_int))
+    h_itr=itr.ctypes.data_as(ct.POINTER(ct.c_int))
+  # 256 colours from each colour scale, from the bottom of the scale to the top
+  luts=np.ascontiguousarray([color_map(np.linspace(0.,1.,256),bytes=True) for color_map in colors],dtype=np.uint8)
+  # array to store the colour of each pixel
+  rgba=_pinned_array(ct.c_uint8,(y_resolution,x_resolution,4))
+
+  # call the library function, which leaves the image untouched if there are too few colour scales
+  converged=_compose_newton_cuda(
+    rgba.ctypes.data_as(ct.POINTER(ct.c_uint8)),h_ind,h_itr,luts.ctypes.data_as(ct.POINTER(ct.c_uint8)),ct.c_int(num_roots)
+    ,ct.c_int(len(colors)),ct.c_int(x_resolution),ct.c_int(y_resolution),ct.c_bool(log),_cuda_stream(stream)
+    ,_cuda_buffers(buffers,x_resolution,y_resolution,max(num_roots,1))
+  )
+  _check_colors(converged,colors)
 
-  if show_fig:
-    plt.show()
-  if save_fig:
-    plt.savefig(file_name,dpi=dpi)
+  return rgba
 
 def sample_newton(coeffs,central_point,x_span,y_span,x_resolution,y_resolution,max_itr,num_threads=1,verbose=False):
   '''
@@ -412,6 +676,7 @@ def sample_newton(coeffs,central_point,x_span,y_span,x_resolution,y_resolution,m
   -------
   roots : 2D numpy.ndarray
     - The approximation of the root which was found.
+      Row 0 is the bottom of the sampled area, so [0,0] is its lower left corner; plot with `origin='lower'`.
   ind : 2D numpy.ndarray
     - The root converged to.
   itr : 2D numpy.ndarray
@@ -426,50 +691,48 @@ def sample_newton(coeffs,central_point,x_span,y_span,x_resolution,y_resolution,m
   endx=central_point[0]+x_span/2.
   endy=central_point[1]+y_span/2.
   
-  # arrays to store the real part of the root approached and the imaginary part of the root approached
-  tmp_re,act_re=c_matrix(ct.c_double,y_resolution,x_resolution)
-  tmp_im,act_im=c_matrix(ct.c_double,y_resolution,x_resolution)
+  # arrays to store the real part of the root approached and the imaginary part of the root approached, which the library writes into
+  # directly
+  re=_aligned_empty((y_resolution,x_resolution),np.double)
+  im=_aligned_empty((y_resolution,x_resolution),np.double)
   # array to store the iteration count to get to the root
-  tmp_itr,act_itr=c_matrix(ct.c_int,y_resolution,x_resolution)
+  itr=_aligned_empty((y_resolution,x_resolution),np.intc)
+  # array to store which root the approximation is
+  ind=_aligned_empty((y_resolution,x_resolution),np.intc)
   # coefficients of the polynomial in library form
-  poly_coeffs=c_vector(ct.c_double,len(coeffs),coeffs)
+  poly_coeffs=np.ascontiguousarray(coeffs,dtype=np.double)
   poly_degree=len(coeffs)-1
 
-  # call the library function
-  limit=_sample_newton(
-    tmp_re,tmp_im,tmp_itr,poly_coeffs,ct.c_int(max_itr),ct.c_int(num_threads),ct.c_int(poly_degree),ct.c_int(x_resolution)
-    ,ct.c_int(y_resolution),ct.c_double(startx),ct.c_double(endx),ct.c_double(starty),ct.c_double(endy),ct.c_bool(verbose)
-  )
-
-  del tmp_itr
-  del tmp_re
-  del tmp_im
-  # convert roots to a numpy array
-  roots=1j*np.ctypeslib.as_array(act_im)
-  roots+=np.ctypeslib.as_array(act_re)
-
-  # determine the actual roots
-  actuals=np.roots(np.flip(coeffs))
-  # real and imaginary parts of the actual roots
-  roots_re=c_vector(ct.c_double,len(actuals),np.real(actuals))
-  roots_im=c_vector(ct.c_double,len(actuals),np.imag(actuals))
-  # array to store which root the approximation is
-  ind=c_vector(ct.c_int,y_resolution*x_resolution)
-  
-  # we can't use `act_re` and `act_im` because they're 2d and we need a 1d vector
-  total=x_resolution*y_resolution
-  re=c_vector(ct.c_double,total,np.real(roots.flatten()))
-  im=c_vector(ct.c_double,total,np.imag(roots.flatten()))
-  # call the library function
-  _assign_roots(ind,re,im,roots_re,roots_im,ct.c_int(poly_degree),ct.c_int(x_resolution),ct.c_int(y_resolution))
-
-  # reshape into a 2D array and flip the rows because [startx,stary] is stored in [0,0] 
-  return np.flipud(roots) \
-    ,np.flipud(np.reshape(np.ctypeslib.as_array(ind),(y_resolution,x_resolution))) \
-    ,np.flipud(np.ctypeslib.as_array(act_itr)) \
+  # determine the actual roots, which the library assigns each approximation to as soon as it is found
+  roots_re,roots_im=_poly_roots(tuple(poly_coeffs))
+
+  if NUMBA_ENABLED:
+    # the library marks where no root was reached with the largest int
+    limit=np.iinfo(np.intc).max
+    set_num_threads(min(num_threads,config.NUMBA_NUM_THREADS))
+    _sample_newton_numba(re,im,itr,ind,poly_coeffs,roots_re,roots_im,max_itr,startx,starty,(endx-startx)/x_resolution
+      ,(endy-starty)/y_resolution,1e-6,limit)
+  else:
+    # call the library function
+    limit=_sample_newton(
+      re.ctypes.data_as(ct.POINTER(ct.c_double)),im.ctypes.data_as(ct.POINTER(ct.c_double)),itr.ctypes.data_as(ct.POINTER(ct.c_int))
+      ,ind.ctypes.data_as(ct.POINTER(ct.c_int)),poly_coeffs.ctypes.data_as(ct.POINTER(ct.c_double))
+      ,roots_re.ctypes.data_as(ct.POINTER(ct.c_double)),roots_im.ctypes.data_as(ct.POINTER(ct.c_double)),ct.c_int(max_itr)
+      ,ct.c_int(num_threads),ct.c_int(poly_degree),ct.c_int(x_resolution),ct.c_int(y_resolution),ct.c_double(startx)
+      ,ct.c_double(endx),ct.c_double(starty),ct.c_double(endy),ct.c_bool(verbose)
+    )
+
+  # only now convert roots to a complex numpy array
+  roots=1j*im
+  roots+=re
+
+  return roots \
+    ,ind \
+    ,itr \
     ,limit
 
-def sample_newton_cuda(coeffs,central_point,x_span,y_span,x_resolution,y_resolution,max_itr,verbose=False):
+def sample_newton_cuda(coeffs,central_point,x_span,y_span,x_resolution,y_resolution,max_itr,verbose=False,stream=None
+  ,precision='double',buffers=None):
   '''
   Produce Newton's fractals for a given polynomial with CUDA acceleration.
   
@@ -487,11 +750,20 @@ def sample_newton_cuda(coeffs,central_point,x_span,y_span,x_resolution,y_resolut
     - The number of iterations to compute before considering a point to not converge.
   verbose : bool, optional
     - For verbose output.
+  stream : ctypes.c_void_p, optional
+    - The CUDA stream to compute on, from `create_stream`. By default, each thread computes on a stream of its own.
+  precision : string, optional
+    - The precision to compute in, one of: 'double', 'float'.
+      'float' is much faster on most GPUs, but is only suitable at lower zoom levels.
+  buffers : optional
+    - The device memory to compute in, from `init_buffers` with the same resolution. By default, device memory is allocated for this
+      sample only.
 
   Returns
   -------
   roots : 2D numpy.ndarray
     - The approximation of the root which was found.
+      Row 0 is the bottom of the sampled area, so [0,0] is its lower left corner; plot with `origin='lower'`.
   ind : 2D numpy.ndarray
     - The root converged to.
   itr : 2D numpy.ndarray
@@ -501,47 +773,269 @@ def sample_newton_cuda(coeffs,central_point,x_span,y_span,x_resolution,y_resolut
 
   '''
   if not CUDA_ENABLED: raise CUDAWarning('CUDA library has not been implemented.')
+  if precision not in _CUDA_PRECISIONS:
+    raise ValueError('`precision` must be one of {}'.format(list(_CUDA_PRECISIONS)))
+  if len(coeffs)-1>_MAX_DEGREE_CUDA:
+    raise ValueError('Polynomials of degree greater than {} cannot be sampled with CUDA.'.format(_MAX_DEGREE_CUDA))
   # input setup
   startx=central_point[0]-x_span/2.
   starty=central_point[1]-y_span/2.
   endx=central_point[0]+x_span/2.
   endy=central_point[1]+y_span/2.
   
-  # arrays to store the real part of the root approached and the imaginary part of the root approached
-  re=c_vector(ct.c_double,y_resolution*x_resolution)
-  im=c_vector(ct.c_double,y_resolution*x_resolution)
+  # arrays to store the real part of the root approached and the imaginary part of the root approached, in the precision computed in
+  c_type=_CUDA_PRECISIONS[precision]
+  re=_pinned_array(c_type,(y_resolution,x_resolution))
+  im=_pinned_array(c_type,(y_resolution,x_resolution))
   # array to store the iteration count to get to the root
-  itr=c_vector(ct.c_int,y_resolution*x_resolution)
+  itr=_pinned_array(ct.c_int,(y_resolution,x_resolution))
+  # array to store which root the approximation is
+  ind=_pinned_array(ct.c_int,(y_resolution,x_resolution))
   # coefficients of the polynomial in library form
-  poly_coeffs=c_vector(ct.c_double,len(coeffs),coeffs)
+  poly_coeffs=np.ascontiguousarray(coeffs,dtype=np.double)
   poly_degree=len(coeffs)-1
 
+  # determine the actual roots, which the library assigns each approximation to as soon as it is found
+  roots_re,roots_im=_poly_roots(tuple(poly_coeffs))
+
   # call the library function
-  limit=_sample_newton_cuda(
-    re,im,itr,poly_coeffs,ct.c_int(max_itr),ct.c_int(poly_degree),ct.c_int(x_resolution),ct.c_int(y_resolution)
-    ,ct.c_double(startx),ct.c_double(endx),ct.c_double(starty),ct.c_double(endy),ct.c_bool(verbose)
+  limit=_sample_newton_cuda[precision](
+    re.ctypes.data_as(ct.POINTER(c_type)),im.ctypes.data_as(ct.POINTER(c_type)),itr.ctypes.data_as(ct.POINTER(ct.c_int))
+    ,ind.ctypes.data_as(ct.POINTER(ct.c_int)),poly_coeffs.ctypes.data_as(ct.POINTER(ct.c_double))
+    ,roots_re.ctypes.data_as(ct.POINTER(ct.c_double)),roots_im.ctypes.data_as(ct.POINTER(ct.c_double)),ct.c_int(max_itr)
+    ,ct.c_int(poly_degree),ct.c_int(x_resolution),ct.c_int(y_resolution),ct.c_double(startx),ct.c_double(endx),ct.c_double(starty)
+    ,ct.c_double(endy),ct.c_bool(verbose),_cuda_stream(stream),_cuda_buffers(buffers,x_resolution,y_resolution,poly_degree)
   )
 
-  # convert roots to a numpy array
-  roots=1j*np.ctypeslib.as_array(im)
-  roots+=np.ctypeslib.as_array(re)
+  # only now convert roots to a complex numpy array
+  roots=1j*im
+  roots+=re
+
+  return roots \
+    ,ind \
+    ,itr \
+    ,limit
+
+def _cuda_stream(stream):
+  '''
+  Internal function to determine the CUDA stream to compute a sample on.
+  
+  Parameters
+  ----------
+  stream : ctypes.c_void_p or None
+    - The stream given to the sampler.
+
+  Returns
+  -------
+  stream : ctypes.c_void_p
+    The given stream or, if None was given, the stream belonging to the calling thread.
+
+  '''
+  if stream is not None:
+    return stream
+  if not hasattr(_streams,'stream'):
+    _streams.stream=create_stream()
+    # release the stream once its thread has finished with it
+    weakref.finalize(_streams.stream,_destroy_stream,_streams.stream.value)
+  return _streams.stream
+
+def _cuda_buffers(buffers,x_resolution,y_resolution,degree=0):
+  '''
+  Internal function to check the device memory given to a CUDA sampler can hold the sample.
+  
+  Parameters
+  ----------
+  buffers : from `init_buffers`, or None
+    - The device memory given to the sampler.
+  x_resolution,y_resolution : int
+    - The resolution of the sample.
+  degree : int, optional
+    - The degree of the polynomial sampled, or 0 if the sample is not of Newton's method.
+
+  Returns
+  -------
+  buffers : from `init_buffers`, or None
+    The given device memory.
 
-  # determine the actual roots
+  '''
+  if buffers is None:
+    return None
+  if (buffers.contents.xresolution,buffers.contents.yresolution)!=(x_resolution,y_resolution):
+    raise ValueError('`buffers` were allocated for a resolution of {}x{}'.format(buffers.contents.xresolution
+      ,buffers.contents.yresolution))
+  if buffers.contents.degree<degree:
+    raise ValueError('`buffers` were allocated for polynomials of degree at most {}'.format(buffers.contents.degree))
+  return buffers
+
+def _check_colors(num_roots,colors):
+  '''
+  Internal function to check there is a colour scale for each root converged to.
+  
+  Parameters
+  ----------
+  num_roots : int
+    - The number of roots converged to.
+  colors : list
+    - The colour scales given.
+
+  '''
+  if num_roots>len(colors):
+    raise IndexError('{} roots were converged to, but only {} colour scales were given'.format(num_roots,len(colors)))
+
+def _pinned_array(c_type,shape):
+  '''
+  Internal function to produce an array in page-locked host memory, which the CUDA library can copy into asynchronously.
+  
+  Parameters
+  ----------
+  c_type : ctypes type
+    - The type of the elements of the array.
+  shape : tuple
+    - The shape of the array.
+
+  Returns
+  -------
+  arr : numpy.ndarray
+    The array, whose memory is released when it is garbage collected.
+
+  '''
+  ptr=_alloc_pinned(ct.c_size_t(ct.sizeof(c_type)*int(np.prod(shape))))
+  arr=np.ctypeslib.as_array(ct.cast(ptr,ct.POINTER(c_type)),shape=shape)
+  # views of `arr` keep it alive, so the memory is only released once nothing refers to it
+  weakref.finalize(arr,_free_pinned,ptr)
+
+  return arr
+
+def _aligned_empty(shape,dtype,alignment=64):
+  '''
+  Internal function to produce an uninitialised array whose data starts on a boundary of `alignment` bytes, so that the library can write
+  into it with aligned vector stores.
+  
+  Parameters
+  ----------
+  shape : tuple
+    - The shape of the array.
+  dtype : numpy.dtype
+    - The type of the elements of the array.
+  alignment : int
+    - The boundary, in bytes, on which the data of the array starts.
+
+  Returns
+  -------
+  arr : numpy.ndarray
+    The array, which is a view into a slightly larger buffer.
+
+  '''
+  dtype=np.dtype(dtype)
+  size=dtype.itemsize*int(np.prod(shape))
+  raw=np.empty(size+alignment,dtype=np.uint8)
+  offset=-raw.ctypes.data%alignment
+
+  return raw[offset:offset+size].view(dtype).reshape(shape)
+
+@functools.lru_cache(maxsize=32)
+def _poly_roots(coeffs):
+  '''
+  Internal function to find the roots of a polynomial, caching the result so that repeated samples of the same polynomial solve for its
+  roots only once.
+  
+  Parameters
+  ----------
+  coeffs : tuple of float
+    - The coefficients of the polynomial, with the ith element being the coefficient of x^i.
+
+  Returns
+  -------
+  roots_re : numpy.ndarray
+    The real parts of the roots, which are read-only as they are shared between calls.
+  roots_im : numpy.ndarray
+    The imaginary parts of the roots, which are read-only as they are shared between calls.
+
+  '''
   actuals=np.roots(np.flip(coeffs))
-  # real and imaginary parts of the actual roots
-  roots_re=c_vector(ct.c_double,len(actuals),np.real(actuals))
-  roots_im=c_vector(ct.c_double,len(actuals),np.imag(actuals))
-  # array to store which root the approximation is
-  ind=c_vector(ct.c_int,y_resolution*x_resolution)
+  roots_re=np.ascontiguousarray(np.real(actuals),dtype=np.double)
+  roots_im=np.ascontiguousarray(np.imag(actuals),dtype=np.double)
+  roots_re.flags.writeable=False
+  roots_im.flags.writeable=False
 
-  # call the library function
-  _assign_roots_cuda(ind,re,im,roots_re,roots_im,ct.c_int(poly_degree),ct.c_int(x_resolution),ct.c_int(y_resolution))
+  return roots_re,roots_im
 
-  # reshape into a 2D array and flip the rows because [startx,stary] is stored in [0,0] 
-  return np.flipud(np.reshape(roots,(y_resolution,x_resolution))) \
-    ,np.flipud(np.reshape(np.ctypeslib.as_array(ind),(y_resolution,x_resolution))) \
-    ,np.flipud(np.reshape(np.ctypeslib.as_array(itr),(y_resolution,x_resolution))) \
-    ,limit
+def _prepare_iterations(iterations,limit,log):
+  '''
+  Internal function to convert iteration counts to values to plot, where points which reached the limit are NaN.
+
+  Matplotlib draws NaN with the colour map's bad colour, as it does masked values, without a mask the size of the image.
+  
+  Parameters
+  ----------
+  iterations : 2D numpy.ndarray
+    - The number of iterations taken for each pixel.
+  limit : int
+    - The value which represents the limit was reached.
+  log : bool
+    - If the number of iterations should be logged.
+
+  Returns
+  -------
+  values : 2D numpy.ndarray
+    - The values to plot, in single precision, which is plenty for colouring.
+
+  '''
+  reached=iterations==limit
+  if log and np.issubdtype(iterations.dtype,np.integer):
+    # iteration counts are small integers, so look up the log of each in a table rather than taking the log of every pixel
+    # the table covers every count but the limit, which may be far larger, and need not be the largest count
+    largest=int(iterations.max(initial=0,where=~reached))
+    with np.errstate(divide='ignore'):
+      table=np.log(np.arange(largest+1,dtype=np.float32))
+    # clipping keeps the lookup of the limit in bounds, before it is replaced below
+    values=np.take(table,iterations,mode='clip')
+  elif log:
+    with np.errstate(divide='ignore'):
+      values=np.log(iterations,dtype=np.float32)
+  else:
+    values=iterations.astype(np.float32)
+  values[reached]=np.nan
+
+  return values
+
+def _render(image,show_fig,save_fig,file_name,fig_inches,dpi,color_map=None):
+  '''
+  Internal function to show and save a visualisation.
+
+  If the visualisation is only saved, to a format PIL writes, it is written directly at the resolution of the sample, which is far faster
+  than rasterising it through matplotlib at `dpi`.
+  
+  Parameters
+  ----------
+  image : 2D or 3D numpy.ndarray
+    - The values to colour with `color_map` or, if `color_map` is None, the RGBA colour of each pixel.
+      Row 0 is the bottom of the visualisation.
+  show_fig,save_fig,file_name,fig_inches,dpi
+    - See the plotting functions.
+  color_map : matplotlib.colors.Colormap, optional
+    - The colours to use in the visualisation.
+
+  '''
+  if save_fig and not show_fig and os.path.splitext(file_name)[1].lower() in _PIL_EXTENSIONS:
+    if color_map is not None:
+      # normalise over the finite values as imshow does, where NaN and the -inf of a logged 0 take the bad colour
+      image=color_map(Normalize()(np.ma.masked_invalid(image)),bytes=True)
+    elif image.dtype!=np.uint8:
+      image=np.round(image*255).astype(np.uint8)
+    # every visualisation is opaque, and row 0 of an image file is its top
+    # the resolution is chosen so that the image is the size of the figure
+    Image.fromarray(np.ascontiguousarray(image[::-1,:,:3])).save(file_name
+      ,dpi=(image.shape[1]/fig_inches[0],image.shape[0]/fig_inches[1]))
+    return
+
+  _,ax=_plot_setup(fig_inches)
+  ax.imshow(image,cmap=color_map,origin='lower')
+
+  if show_fig:
+    plt.show()
+  if save_fig:
+    plt.savefig(file_name,dpi=dpi)
 
 def _plot_setup(fig_inches):
   '''
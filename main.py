@@ -195,7 +195,8 @@ def produce_newton_visualisation(example='cubic_zero',method='cpu',fractal_resol
   else:
     _,idx,itr,limit=sample_newton(coeffs,centre,dx*span,dy*span,dx*fractal_resolution,dy*fractal_resolution,limit,num_threads,verbose)
   # produce the visualisation
-  plot_newton(idx,itr,limit,colors,file_name=file_name,fig_inches=(6*dx,6*dy),dpi=dpi,show_fig=show_fig,save_fig=save_fig)
+  plot_newton(idx,itr,limit,colors,file_name=file_name,fig_inches=(6*dx,6*dy),dpi=dpi,show_fig=show_fig,save_fig=save_fig
+    ,cuda=method=='gpu')
 
 if __name__=='__main__':
   produce_mandelbrot_visualisation()
@@ -20,6 +20,13 @@
 #include <limits>
 #include <vector>
 
+// functions which are shared with CUDA device code
+#ifdef __CUDACC__
+#define HOST_DEVICE __host__ __device__
+#else
+#define HOST_DEVICE
+#endif // __CUDACC__
+
 template <typename InputIt, typename OutputIt>
 inline OutputIt zip(InputIt first1, InputIt last1, InputIt first2, InputIt last2, OutputIt out)
 {
@@ -82,6 +89,44 @@ inline std::size_t argmin(It first, It last, Compare comp)
   return std::min_element(first,last,comp)-first;
 }
 
+template <typename T>
+HOST_DEVICE inline int closest_root(const T re, const T im, const T * const roots_re, const T * const roots_im, const int degree)
+{
+  //
+  // Find the index of the root of a polynomial which a number is closest to
+  //
+  // parameters
+  // ----------
+  // re,im : const T
+  //  - the real and imaginary parts of the number
+  // roots_re,roots_im : const T * const
+  //  - the real and imaginary parts of each root of the polynomial
+  // degree : const int
+  //  - the degree of the polynomial, and so the number of roots
+  //
+  // returns
+  // -------
+  // int
+  //  - the index of the closest root
+  //
+
+  int closest=0;
+  T closest_dist=(re-roots_re[0])*(re-roots_re[0])+(im-roots_im[0])*(im-roots_im[0]);
+
+  // the squared distance orders the roots the same as the distance
+  for (int itr=1;itr<degree;++itr)
+  {
+    const T dist=(re-roots_re[itr])*(re-roots_re[itr])+(im-roots_im[itr])*(im-roots_im[itr]);
+    if (dist<closest_dist)
+    {
+      closest=itr;
+      closest_dist=dist;
+    }
+  }
+
+  return closest;
+}
+
 void __declspec(dllexport) assign_roots(int * const idx, const double * const re, const double * const im
   , const double * const roots_re, const double * const roots_im, const int degree, const int xresolution, const int yresolution);
 
@@ -0,0 +1,138 @@
+
+//+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+//
+//                                                                                                                                       //
+// cu_common.cu                                                                                                                          //
+//                                                                                                                                       //
+// D. C. Groothuizen Dijkema - April, 2020                                                                                               //
+//+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+//
+
+// Memory management common to all CUDA accelerated implementations of the Fractal project
+
+
+#include <cu_fractal.hpp>
+
+void * __declspec(dllexport) alloc_pinned(const size_t size)
+{
+  //
+  // Allocate page-locked host memory, which the device can copy to and from asynchronously
+  //
+  // parameters
+  // ----------
+  // size : const size_t
+  //  - the number of bytes to allocate
+  //
+  // returns
+  // -------
+  // void *
+  //  - a pointer to the allocated memory, to be released with free_pinned()
+  //
+
+  void *ptr=nullptr;
+  CUDA_REQUIRE_SUCCESS(cudaHostAlloc(&ptr,size,cudaHostAllocDefault));
+
+  return ptr;
+}
+
+void __declspec(dllexport) free_pinned(void * const ptr)
+{
+  //
+  // Release page-locked host memory allocated by alloc_pinned()
+  //
+  // parameters
+  // ----------
+  // ptr : void * const
+  //  - the memory to release
+  //
+
+  CUDA_REQUIRE_SUCCESS(cudaFreeHost(ptr));
+}
+
+cudaStream_t __declspec(dllexport) create_stream()
+{
+  //
+  // Create a CUDA stream, so that samples can be queued on it independently of samples on other streams
+  //
+  // returns
+  // -------
+  // cudaStream_t
+  //  - the created stream, to be released with destroy_stream()
+  //
+
+  cudaStream_t stream;
+  CUDA_REQUIRE_SUCCESS(cudaStreamCreate(&stream));
+
+  return stream;
+}
+
+void __declspec(dllexport) destroy_stream(const cudaStream_t stream)
+{
+  //
+  // Release a CUDA stream created by create_stream(), once all work queued on it is complete
+  //
+  // parameters
+  // ----------
+  // stream : const cudaStream_t
+  //  - the stream to release
+  //
+
+  CUDA_REQUIRE_SUCCESS(cudaStreamDestroy(stream));
+}
+
+cu_buffers * __declspec(dllexport) init_buffers(const int xresolution, const int yresolution, const int degree)
+{
+  //
+  // Allocate device memory which samples of a given resolution can reuse, rather than allocating and freeing their own
+  //
+  // parameters
+  // ----------
+  // xresolution,yresolution : const int
+  //  - the number of steps the samples take in the x- and y-direction (the real and imaginary components)
+  // degree : const int
+  //  - the largest degree of polynomial to be sampled with Newton's method
+  //    if 0, only the memory needed by the Mandelbrot and Julia Sets is allocated
+  //
+  // returns
+  // -------
+  // cu_buffers *
+  //  - the buffers, to be released with free_buffers()
+  //    these must not be used by two samples at once
+  //
+
+  const size_t total=static_cast<size_t>(xresolution)*yresolution;
+  cu_buffers *buffers=new cu_buffers{xresolution,yresolution,degree,nullptr,nullptr,nullptr,nullptr,nullptr,nullptr,nullptr};
+
+  CUDA_REQUIRE_SUCCESS(cudaMalloc(reinterpret_cast<void **>(&buffers->d_itr),total*sizeof(int)));
+  if (degree>0)
+  {
+    CUDA_REQUIRE_SUCCESS(cudaMalloc(reinterpret_cast<void **>(&buffers->d_re),total*sizeof(double)));
+    CUDA_REQUIRE_SUCCESS(cudaMalloc(reinterpret_cast<void **>(&buffers->d_im),total*sizeof(double)));
+    CUDA_REQUIRE_SUCCESS(cudaMalloc(reinterpret_cast<void **>(&buffers->d_ind),total*sizeof(int)));
+    CUDA_REQUIRE_SUCCESS(cudaMalloc(reinterpret_cast<void **>(&buffers->d_coeffs),(degree+1)*sizeof(double)));
+    CUDA_REQUIRE_SUCCESS(cudaMalloc(reinterpret_cast<void **>(&buffers->d_luts),degree*256*sizeof(uchar4)));
+    CUDA_REQUIRE_SUCCESS(cudaMalloc(reinterpret_cast<void **>(&buffers->d_bounds),2*degree*sizeof(int)));
+  }
+
+  return buffers;
+}
+
+void __declspec(dllexport) free_buffers(cu_buffers * const buffers)
+{
+  //
+  // Release device memory allocated by init_buffers(), once all work using it is complete
+  //
+  // parameters
+  // ----------
+  // buffers : cu_buffers * const
+  //  - the buffers to release
+  //
+
+  // cudaFree() does nothing with a null pointer, so the buffers not allocated for a degree of 0 need no special handling
+  CUDA_REQUIRE_SUCCESS(cudaFree(buffers->d_re));
+  CUDA_REQUIRE_SUCCESS(cudaFree(buffers->d_im));
+  CUDA_REQUIRE_SUCCESS(cudaFree(buffers->d_coeffs));
+  CUDA_REQUIRE_SUCCESS(cudaFree(buffers->d_itr));
+  CUDA_REQUIRE_SUCCESS(cudaFree(buffers->d_ind));
+  CUDA_REQUIRE_SUCCESS(cudaFree(buffers->d_luts));
+  CUDA_REQUIRE_SUCCESS(cudaFree(buffers->d_bounds));
+  delete buffers;
+}
@@ -23,8 +23,14 @@
 #include <thrust/pair.h>
 #include <thrust/tuple.h>
 
+#include <cstdint>
+#include <type_traits>
+
 #include <common.hpp>
 
+// the largest degree of polynomial whose roots can be passed to a kernel by value
+#define MAX_DEGREE 64
+
 #define CUDA_REQUIRE_SUCCESS(ans) { cuda_check((ans),__FILE__,__func__,__LINE__); }
 inline void cuda_check(const cudaError_t code, const char * const file, const char * const func,const int line)
 {
@@ -36,28 +42,129 @@ inline void cuda_check(const cudaError_t code, const char * const file, const ch
   }
 }
 
-__device__ int iterate(cuDoubleComplex x, const cuDoubleComplex &c, const int max_itr);
+// device memory kept between samples of the same resolution, so that each sample need not allocate and free its own
+// the roots approached are held in double precision so that samples in either precision can write into them
+// the colour scales and the bounds of each root used to compose an image of a sample of Newton's method are kept for its degree too
+struct cu_buffers
+{
+  int xresolution,yresolution,degree;
+  double *d_re,*d_im,*d_coeffs;
+  int *d_itr,*d_ind;
+  uchar4 *d_luts;
+  int *d_bounds;
+};
+
+// the roots of the polynomial being sampled, passed to the kernel by value so that samples on other streams cannot overwrite them
+struct cu_roots
+{
+  double re[MAX_DEGREE],im[MAX_DEGREE];
+};
+
+// the colour scale of each root and the bounds of the values shading its pixels, passed to the kernel by value for the same reason
+struct cu_scales
+{
+  int slots[MAX_DEGREE];
+  float lower[MAX_DEGREE],upper[MAX_DEGREE];
+};
+
+void * __declspec(dllexport) alloc_pinned(const size_t size);
+void __declspec(dllexport) free_pinned(void * const ptr);
+cudaStream_t __declspec(dllexport) create_stream();
+void __declspec(dllexport) destroy_stream(const cudaStream_t stream);
+cu_buffers * __declspec(dllexport) init_buffers(const int xresolution, const int yresolution, const int degree);
+void __declspec(dllexport) free_buffers(cu_buffers * const buffers);
+
+// the complex type of the given precision, so that the device code can be written once for both single and double precision
+template <typename T>
+using cu_complex=typename std::conditional<std::is_same<T,float>::value,cuFloatComplex,cuDoubleComplex>::type;
+
+// overloads of the cuComplex functions for both precisions
+__device__ inline cuFloatComplex make_cu_complex(const float re, const float im) { return make_cuFloatComplex(re,im); }
+__device__ inline cuDoubleComplex make_cu_complex(const double re, const double im) { return make_cuDoubleComplex(re,im); }
+__device__ inline float cu_real(const cuFloatComplex &x) { return cuCrealf(x); }
+__device__ inline double cu_real(const cuDoubleComplex &x) { return cuCreal(x); }
+__device__ inline float cu_imag(const cuFloatComplex &x) { return cuCimagf(x); }
+__device__ inline double cu_imag(const cuDoubleComplex &x) { return cuCimag(x); }
+__device__ inline float cu_abs(const cuFloatComplex &x) { return cuCabsf(x); }
+__device__ inline double cu_abs(const cuDoubleComplex &x) { return cuCabs(x); }
+__device__ inline cuFloatComplex cu_add(const cuFloatComplex &x, const cuFloatComplex &y) { return cuCaddf(x,y); }
+__device__ inline cuDoubleComplex cu_add(const cuDoubleComplex &x, const cuDoubleComplex &y) { return cuCadd(x,y); }
+__device__ inline cuFloatComplex cu_sub(const cuFloatComplex &x, const cuFloatComplex &y) { return cuCsubf(x,y); }
+__device__ inline cuDoubleComplex cu_sub(const cuDoubleComplex &x, const cuDoubleComplex &y) { return cuCsub(x,y); }
+__device__ inline cuFloatComplex cu_mul(const cuFloatComplex &x, const cuFloatComplex &y) { return cuCmulf(x,y); }
+__device__ inline cuDoubleComplex cu_mul(const cuDoubleComplex &x, const cuDoubleComplex &y) { return cuCmul(x,y); }
+__device__ inline cuFloatComplex cu_div(const cuFloatComplex &x, const cuFloatComplex &y) { return cuCdivf(x,y); }
+__device__ inline cuDoubleComplex cu_div(const cuDoubleComplex &x, const cuDoubleComplex &y) { return cuCdiv(x,y); }
+
+template <typename T>
+__device__ int iterate(cu_complex<T> x, const cu_complex<T> &c, const int max_itr);
+template <typename T>
 __global__ void compute_mandelbrot(int * const d_iterations, const int max_itr, const int xresolution, const int yresolution
-  , const double startx, const double starty, const double deltax, const double deltay);
-__global__ void compute_julia(int * const d_iterations, const double re, const double im, const int max_itr
-  , const int xresolution, const int yresolution, const double startx, const double starty, const double deltax, const double deltay);
+  , const T startx, const T starty, const T deltax, const T deltay);
+template <typename T>
+__global__ void compute_julia(int * const d_iterations, const T re, const T im, const int max_itr, const int xresolution
+  , const int yresolution, const T startx, const T starty, const T deltax, const T deltay);
 
-int __declspec(dllexport) sample_mandelbrot(int * const h_iterations, const int max_itr, const int xresolution, const int yresolution
-  , const double startx, const double endx, const double starty, const double endy, const bool verbose);
+template <typename T>
+int sample_mandelbrot_impl(int * const h_itr, const int max_itr, const int xresolution, const int yresolution, const double startx
+  , const double endx, const double starty, const double endy, const bool verbose, const cudaStream_t stream, cu_buffers * const buffers);
+template <typename T>
+int sample_julia_impl(int * const h_itr, const double re, const double im, const int max_itr, const int xresolution
+  , const int yresolution, const double startx, const double endx, const double starty, const double endy, const bool verbose
+  , const cudaStream_t stream, cu_buffers * const buffers);
+int __declspec(dllexport) sample_mandelbrot(int * const h_itr, const int max_itr, const int xresolution, const int yresolution
+  , const double startx, const double endx, const double starty, const double endy, const bool verbose, const cudaStream_t stream
+  , cu_buffers * const buffers);
+int __declspec(dllexport) sample_mandelbrot_f32(int * const h_itr, const int max_itr, const int xresolution, const int yresolution
+  , const double startx, const double endx, const double starty, const double endy, const bool verbose, const cudaStream_t stream
+  , cu_buffers * const buffers);
 int __declspec(dllexport) sample_julia(int * const h_itr, const double re, const double im, const int max_itr
   , const int xresolution, const int yresolution, const double startx, const double endx, const double starty, const double endy
-  , const bool verbose);
+  , const bool verbose, const cudaStream_t stream, cu_buffers * const buffers);
+int __declspec(dllexport) sample_julia_f32(int * const h_itr, const double re, const double im, const int max_itr
+  , const int xresolution, const int yresolution, const double startx, const double endx, const double starty, const double endy
+  , const bool verbose, const cudaStream_t stream, cu_buffers * const buffers);
 
-__device__ thrust::pair<cuDoubleComplex,cuDoubleComplex> polynomial_and_deriv(const cuDoubleComplex &x, const double * const coeffs
+template <typename T>
+__device__ thrust::pair<cu_complex<T>,cu_complex<T>> polynomial_and_deriv(const cu_complex<T> &x, const T * const coeffs
   , const int degree);
-__device__ cuDoubleComplex newton_root(const double * const coeffs, int * const itr_taken, cuDoubleComplex x, const int degree
-  , const int max_itr, const double tol);
-__global__ void compute_newton(double * const d_re, double * const d_im, int * const d_itr, const double * const d_coeffs, const int max_itr
-  , const int degree, const int xresolution, const int yresolution, const double startx, const double starty, const double deltax
-  , const double deltay);
-
-int __declspec(dllexport) sample_newton(double * const h_re, double * const h_im, int * const h_itr, const double * const h_coeffs
-  , const int max_itr, const int degree, const int xresolution, const int yresolution, const double startx, const double endx
-  , const double starty, const double endy, const bool verbose);
+template <typename T>
+__device__ cu_complex<T> newton_root(const T * const coeffs, int * const itr_taken, cu_complex<T> x, const int degree
+  , const int max_itr, const T tol);
+template <typename T>
+__global__ void compute_newton(T * const d_re, T * const d_im, int * const d_itr, int * const d_ind, const T * const d_coeffs
+  , const cu_roots roots, const int max_itr, const int degree, const int xresolution, const int yresolution, const T startx
+  , const T starty, const T deltax, const T deltay, const T tol);
+
+template <typename T>
+int sample_newton_impl(T * const h_re, T * const h_im, int * const h_itr, int * const h_ind, const double * const h_coeffs
+  , const double * const h_roots_re, const double * const h_roots_im, const int max_itr, const int degree, const int xresolution
+  , const int yresolution, const double startx, const double endx, const double starty, const double endy, const bool verbose
+  , const cudaStream_t stream, cu_buffers * const buffers);
+int __declspec(dllexport) sample_newton(double * const h_re, double * const h_im, int * const h_itr, int * const h_ind
+  , const double * const h_coeffs, const double * const h_roots_re, const double * const h_roots_im, const int max_itr, const int degree
+  , const int xresolution, const int yresolution, const double startx, const double endx, const double starty, const double endy
+  , const bool verbose, const cudaStream_t stream, cu_buffers * const buffers);
+int __declspec(dllexport) sample_newton_f32(float * const h_re, float * const h_im, int * const h_itr, int * const h_ind
+  , const double * const h_coeffs, const double * const h_roots_re, const double * const h_roots_im, const int max_itr, const int degree
+  , const int xresolution, const int yresolution, const double startx, const double endx, const double starty, const double endy
+  , const bool verbose, const cudaStream_t stream, cu_buffers * const buffers);
+
+HOST_DEVICE inline float shade(const int itr, const bool take_log)
+{
+  //
+  // The value a pixel of Newton's fractals is shaded by, from the number of iterations it took to converge
+  // a starting point which is already a root takes no iterations, and is shaded as if it took one, rather than by the log of 0
+  //
+  const float value=take_log ? logf(static_cast<float>(itr>1 ? itr : 1)) : static_cast<float>(itr);
+  return value*value;
+}
+__global__ void compute_root_bounds(const int * const d_ind, const int * const d_itr, int * const d_lowest, int * const d_highest
+  , const int num_roots, const int total);
+__global__ void compute_newton_rgba(uchar4 * const d_rgba, const int * const d_ind, const int * const d_itr, const uchar4 * const d_luts
+  , const cu_scales scales, const int num_roots, const int total, const bool take_log);
+int __declspec(dllexport) compose_newton(std::uint8_t * const h_rgba, const int * const h_ind, const int * const h_itr
+  , const std::uint8_t * const h_luts, const int num_roots, const int num_scales, const int xresolution, const int yresolution
+  , const bool take_log, const cudaStream_t stream, cu_buffers * const buffers);
 
 #endif // !CUFRACTAL_H__
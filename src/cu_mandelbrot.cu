@@ -11,7 +11,8 @@
 
 #include <cu_fractal.hpp>
 
-__device__ int iterate(cuDoubleComplex x, const cuDoubleComplex &c, const int max_itr)
+template <typename T>
+__device__ int iterate(cu_complex<T> x, const cu_complex<T> &c, const int max_itr)
 {
   //
   // CUDA device to iterate a given number under x^2 + c until its absolute value becomes greater than 2 or the maximum number of 
@@ -19,9 +20,9 @@ __device__ int iterate(cuDoubleComplex x, const cuDoubleComplex &c, const int ma
   //
   // parameters
   // ----------
-  // x : cuDoubleComplex
+  // x : cu_complex<T>
   //  - the starting value of the iteration
-  // c : const cuDoubleComplex &
+  // c : const cu_complex<T> &
   //  - the constant added at each iteration
   // max_itr : const int 
   //  - the maximum number of iterations allowed
@@ -35,14 +36,15 @@ __device__ int iterate(cuDoubleComplex x, const cuDoubleComplex &c, const int ma
 
   for (int itr=0;itr<max_itr;++itr)
   {
-    if (cuCabs(x)>2) { return itr; }
-    x=cuCadd(cuCmul(x,x),c);
+    if (cu_abs(x)>2) { return itr; }
+    x=cu_add(cu_mul(x,x),c);
   }
   return NPP_MAX_32S;
 }
 
+template <typename T>
 __global__ void compute_mandelbrot(int * const d_iterations, const int max_itr, const int xresolution, const int yresolution
-  , const double startx, const double starty, const double deltax, const double deltay)
+  , const T startx, const T starty, const T deltax, const T deltay)
 {
   //
   // CUDA kernel to determine if a given number of the complex plane is contained within the Mandelbrot Set through iteration
@@ -56,9 +58,9 @@ __global__ void compute_mandelbrot(int * const d_iterations, const int max_itr,
   //  - the maximum number of iterations allowed
   // xresolution,yresolution : const int 
   //  - the number of steps to take in the x-direction (the real components) and the y-direction (the imaginary components)
-  // startx,starty : const int 
+  // startx,starty : const T 
   //  - the real and imaginary components of the number defining the bottom left corner of the entire space being sampled
-  // deltax,deltay : const int 
+  // deltax,deltay : const T 
   //  - the size of the step to take in the x- and y-direction
   //
 
@@ -68,13 +70,14 @@ __global__ void compute_mandelbrot(int * const d_iterations, const int max_itr,
   if (idx>=xresolution||idy>=yresolution) { return; }
 
   // determine the current point
-  const double imag=starty+deltay*idy,real=startx+deltax*idx;
+  const T imag=starty+deltay*idy,real=startx+deltax*idx;
   // determine the number of iterations
-  d_iterations[ind]=iterate(make_cuDoubleComplex(0.,0.),make_cuDoubleComplex(real,imag),max_itr);
+  d_iterations[ind]=iterate<T>(make_cu_complex(T(0),T(0)),make_cu_complex(real,imag),max_itr);
 }
 
-__global__ void compute_julia(int * const d_iterations, const double re, const double im, const int max_itr
-  , const int xresolution, const int yresolution, const double startx, const double starty, const double deltax, const double deltay)
+template <typename T>
+__global__ void compute_julia(int * const d_iterations, const T re, const T im, const int max_itr, const int xresolution
+  , const int yresolution, const T startx, const T starty, const T deltax, const T deltay)
 {
   //
   // CUDA kernel to determine if a given number of the complex plane is contained within the Julia Set of a given complex number through
@@ -85,15 +88,15 @@ __global__ void compute_julia(int * const d_iterations, const double re, const d
   // d_iterations : int * const
   //  - 1D flat array representing a 2D array to write out either the number of iterations needed reach a root or a marker that this root 
   //      could not be reached
-  // re,im : const double
+  // re,im : const T
   //  - the real and imaginary parts of the complex number to find the Julia Set of
   // max_itr : const int
   //  - the maximum number of iterations allowed
   // xresolution,yresolution : const int 
   //  - the number of steps to take in the x-direction (the real components) and the y-direction (the imaginary components)
-  // startx,starty : const int 
+  // startx,starty : const T 
   //  - the real and imaginary components of the number defining the bottom left corner of the entire space being sampled
-  // deltax,deltay : const int 
+  // deltax,deltay : const T 
   //  - the size of the step to take in the x- and y-direction
   //
 
@@ -103,23 +106,25 @@ __global__ void compute_julia(int * const d_iterations, const double re, const d
   if (idx>=xresolution||idy>=yresolution) { return; }
 
   // determine the current point
-  const double imag=starty+deltay*idy,real=startx+deltax*idx;
+  const T imag=starty+deltay*idy,real=startx+deltax*idx;
   // determine the number of iterations
-  d_iterations[ind]=iterate(make_cuDoubleComplex(real,imag),make_cuDoubleComplex(re,im),max_itr);
+  d_iterations[ind]=iterate<T>(make_cu_complex(real,imag),make_cu_complex(re,im),max_itr);
 }
 
-int __declspec(dllexport) sample_mandelbrot(int * const h_itr, const int max_itr, const int xresolution, const int yresolution
-  , const double startx, const double endx, const double starty, const double endy, const bool verbose)
+template <typename T>
+int sample_mandelbrot_impl(int * const h_itr, const int max_itr, const int xresolution, const int yresolution, const double startx
+  , const double endx, const double starty, const double endy, const bool verbose, const cudaStream_t stream, cu_buffers * const buffers)
 {
   //
   // Determine if numbers in a given subset of the complex plane are contained within the Mandelbrot Set through iteration, with CUDA
-  // acceleration
+  // acceleration, computing in the precision T
   //
   // parameters
   // ----------
   // h_itr : int * const
   //  - 1D flat array representing a 2D array to write out either the number of iterations needed to diverge or a marker that the number was
   //      stable
+  //    should be allocated with alloc_pinned() so that the copy back from the device is asynchronous
   // max_itr : const int
   //  - the maximum number of iterations allowed
   // xresolution,yresolution : const int 
@@ -128,6 +133,12 @@ int __declspec(dllexport) sample_mandelbrot(int * const h_itr, const int max_itr
   //  - the first and last values to sample at 
   // verbose : bool
   //  - flag to control logging to console
+  // stream : const cudaStream_t
+  //  - the stream to queue all work on, from create_stream()
+  //    if nullptr, a stream is created for this call only
+  // buffers : cu_buffers * const
+  //  - the device memory to compute in, from init_buffers() with the same resolution
+  //    if nullptr, device memory is allocated for this call only
   //
   // returns
   // -------
@@ -143,26 +154,35 @@ int __declspec(dllexport) sample_mandelbrot(int * const h_itr, const int max_itr
 
   // device memory pointers
   int *d_itr=nullptr;
-  // allocate device memory
-  CUDA_REQUIRE_SUCCESS(cudaMalloc(reinterpret_cast<void **>(&d_itr),static_cast<size_t>(i_size)));
+  // use the given device memory, or allocate our own if none was given
+  if (buffers!=nullptr) { d_itr=buffers->d_itr; }
+  else { CUDA_REQUIRE_SUCCESS(cudaMalloc(reinterpret_cast<void **>(&d_itr),static_cast<size_t>(i_size))); }
 
   // GPU memory setup
   const dim3 dim_block(32,32),dim_grid((xresolution+dim_block.x-1)/dim_block.x,(yresolution+dim_block.y-1)/dim_block.y);
+  // all work is queued on one stream and only synchronised with once the results have been copied back
+  // use the given stream, or one of our own if none was given
+  cudaStream_t work_stream=stream;
+  if (stream==nullptr) { CUDA_REQUIRE_SUCCESS(cudaStreamCreate(&work_stream)); }
   // run and time
   float elapsed;
   cudaEvent_t start,stop;
 
   CUDA_REQUIRE_SUCCESS(cudaEventCreate(&start));
   CUDA_REQUIRE_SUCCESS(cudaEventCreate(&stop));
-  CUDA_REQUIRE_SUCCESS(cudaEventRecord(start,0));
+  CUDA_REQUIRE_SUCCESS(cudaEventRecord(start,work_stream));
 
-  compute_mandelbrot<<<dim_grid,dim_block>>>(d_itr,max_itr,xresolution,yresolution,startx,starty,deltax,deltay);
+  compute_mandelbrot<T><<<dim_grid,dim_block,0,work_stream>>>(d_itr,max_itr,xresolution,yresolution,static_cast<T>(startx)
+    ,static_cast<T>(starty),static_cast<T>(deltax),static_cast<T>(deltay));
   // check for errors
   CUDA_REQUIRE_SUCCESS(cudaPeekAtLastError());
-  CUDA_REQUIRE_SUCCESS(cudaDeviceSynchronize());
 
-  CUDA_REQUIRE_SUCCESS(cudaEventRecord(stop,0));
-  CUDA_REQUIRE_SUCCESS(cudaEventSynchronize(stop));
+  CUDA_REQUIRE_SUCCESS(cudaEventRecord(stop,work_stream));
+
+  // copy back to host, which is asynchronous if `h_itr` is page-locked
+  CUDA_REQUIRE_SUCCESS(cudaMemcpyAsync(h_itr,d_itr,static_cast<size_t>(i_size),cudaMemcpyDeviceToHost,work_stream));
+  CUDA_REQUIRE_SUCCESS(cudaStreamSynchronize(work_stream));
+
   CUDA_REQUIRE_SUCCESS(cudaEventElapsedTime(&elapsed,start,stop));
 
   if (verbose)
@@ -171,28 +191,30 @@ int __declspec(dllexport) sample_mandelbrot(int * const h_itr, const int max_itr
       << "Time taken: " << elapsed/1000 << "s." << std::endl;
   }
 
-  // copy back to host
-  CUDA_REQUIRE_SUCCESS(cudaMemcpy(h_itr,d_itr,static_cast<size_t>(i_size),cudaMemcpyDeviceToHost));
-
   // free GPU memory
-  CUDA_REQUIRE_SUCCESS(cudaFree(d_itr));
+  if (buffers==nullptr) { CUDA_REQUIRE_SUCCESS(cudaFree(d_itr)); }
+  CUDA_REQUIRE_SUCCESS(cudaEventDestroy(start));
+  CUDA_REQUIRE_SUCCESS(cudaEventDestroy(stop));
+  if (stream==nullptr) { CUDA_REQUIRE_SUCCESS(cudaStreamDestroy(work_stream)); }
 
   return NPP_MAX_32S;
 }
 
-int __declspec(dllexport) sample_julia(int * const h_itr, const double re, const double im, const int max_itr
-  , const int xresolution, const int yresolution, const double startx, const double endx, const double starty, const double endy
-  , const bool verbose)
+template <typename T>
+int sample_julia_impl(int * const h_itr, const double re, const double im, const int max_itr, const int xresolution
+  , const int yresolution, const double startx, const double endx, const double starty, const double endy, const bool verbose
+  , const cudaStream_t stream, cu_buffers * const buffers)
 {
   //
   // Determine if numbers in a given subset of the complex plane are contained within the Julia Set of a given complex number through 
-  // iteration, with CUDA acceleration
+  // iteration, with CUDA acceleration, computing in the precision T
   //
   // parameters
   // ----------
   // h_itr : int * const
   //  - 1D flat array representing a 2D array to write out either the number of iterations needed to diverge or a marker that the number was
   //      stable
+  //    should be allocated with alloc_pinned() so that the copy back from the device is asynchronous
   // max_itr : const int
   //  - the maximum number of iterations allowed
   // xresolution,yresolution : const int 
@@ -201,6 +223,12 @@ int __declspec(dllexport) sample_julia(int * const h_itr, const double re, const
   //  - the first and last values to sample at 
   // verbose : bool
   //  - flag to control logging to console
+  // stream : const cudaStream_t
+  //  - the stream to queue all work on, from create_stream()
+  //    if nullptr, a stream is created for this call only
+  // buffers : cu_buffers * const
+  //  - the device memory to compute in, from init_buffers() with the same resolution
+  //    if nullptr, device memory is allocated for this call only
   //
   // returns
   // -------
@@ -216,26 +244,35 @@ int __declspec(dllexport) sample_julia(int * const h_itr, const double re, const
 
   // device memory pointers
   int *d_itr=nullptr;
-  // allocate device memory
-  CUDA_REQUIRE_SUCCESS(cudaMalloc(reinterpret_cast<void **>(&d_itr),static_cast<size_t>(i_size)));
+  // use the given device memory, or allocate our own if none was given
+  if (buffers!=nullptr) { d_itr=buffers->d_itr; }
+  else { CUDA_REQUIRE_SUCCESS(cudaMalloc(reinterpret_cast<void **>(&d_itr),static_cast<size_t>(i_size))); }
 
   // GPU memory setup
   const dim3 dim_block(32,32),dim_grid((xresolution+dim_block.x-1)/dim_block.x,(yresolution+dim_block.y-1)/dim_block.y);
+  // all work is queued on one stream and only synchronised with once the results have been copied back
+  // use the given stream, or one of our own if none was given
+  cudaStream_t work_stream=stream;
+  if (stream==nullptr) { CUDA_REQUIRE_SUCCESS(cudaStreamCreate(&work_stream)); }
   // run and time
   float elapsed;
   cudaEvent_t start,stop;
 
   CUDA_REQUIRE_SUCCESS(cudaEventCreate(&start));
   CUDA_REQUIRE_SUCCESS(cudaEventCreate(&stop));
-  CUDA_REQUIRE_SUCCESS(cudaEventRecord(start,0));
+  CUDA_REQUIRE_SUCCESS(cudaEventRecord(start,work_stream));
 
-  compute_julia<<<dim_grid,dim_block>>>(d_itr,re,im,max_itr,xresolution,yresolution,startx,starty,deltax,deltay);
+  compute_julia<T><<<dim_grid,dim_block,0,work_stream>>>(d_itr,static_cast<T>(re),static_cast<T>(im),max_itr,xresolution,yresolution
+    ,static_cast<T>(startx),static_cast<T>(starty),static_cast<T>(deltax),static_cast<T>(deltay));
   // check for errors
   CUDA_REQUIRE_SUCCESS(cudaPeekAtLastError());
-  CUDA_REQUIRE_SUCCESS(cudaDeviceSynchronize());
 
-  CUDA_REQUIRE_SUCCESS(cudaEventRecord(stop,0));
-  CUDA_REQUIRE_SUCCESS(cudaEventSynchronize(stop));
+  CUDA_REQUIRE_SUCCESS(cudaEventRecord(stop,work_stream));
+
+  // copy back to host, which is asynchronous if `h_itr` is page-locked
+  CUDA_REQUIRE_SUCCESS(cudaMemcpyAsync(h_itr,d_itr,static_cast<size_t>(i_size),cudaMemcpyDeviceToHost,work_stream));
+  CUDA_REQUIRE_SUCCESS(cudaStreamSynchronize(work_stream));
+
   CUDA_REQUIRE_SUCCESS(cudaEventElapsedTime(&elapsed,start,stop));
 
   if (verbose)
@@ -244,11 +281,63 @@ int __declspec(dllexport) sample_julia(int * const h_itr, const double re, const
       << "Time taken: " << elapsed/1000 << "s." << std::endl;
   }
 
-  // copy back to host
-  CUDA_REQUIRE_SUCCESS(cudaMemcpy(h_itr,d_itr,static_cast<size_t>(i_size),cudaMemcpyDeviceToHost));
-
   // free GPU memory
-  CUDA_REQUIRE_SUCCESS(cudaFree(d_itr));
+  if (buffers==nullptr) { CUDA_REQUIRE_SUCCESS(cudaFree(d_itr)); }
+  CUDA_REQUIRE_SUCCESS(cudaEventDestroy(start));
+  CUDA_REQUIRE_SUCCESS(cudaEventDestroy(stop));
+  if (stream==nullptr) { CUDA_REQUIRE_SUCCESS(cudaStreamDestroy(work_stream)); }
 
   return NPP_MAX_32S;
 }
+
+int __declspec(dllexport) sample_mandelbrot(int * const h_itr, const int max_itr, const int xresolution, const int yresolution
+  , const double startx, const double endx, const double starty, const double endy, const bool verbose, const cudaStream_t stream
+  , cu_buffers * const buffers)
+{
+  //
+  // Determine if numbers in a given subset of the complex plane are contained within the Mandelbrot Set through iteration, with CUDA
+  // acceleration in double precision
+  // see sample_mandelbrot_impl() for parameters
+  //
+
+  return sample_mandelbrot_impl<double>(h_itr,max_itr,xresolution,yresolution,startx,endx,starty,endy,verbose,stream,buffers);
+}
+
+int __declspec(dllexport) sample_mandelbrot_f32(int * const h_itr, const int max_itr, const int xresolution, const int yresolution
+  , const double startx, const double endx, const double starty, const double endy, const bool verbose, const cudaStream_t stream
+  , cu_buffers * const buffers)
+{
+  //
+  // Determine if numbers in a given subset of the complex plane are contained within the Mandelbrot Set through iteration, with CUDA
+  // acceleration in single precision, which is much faster on most GPUs but only suitable at lower zoom levels
+  // see sample_mandelbrot_impl() for parameters
+  //
+
+  return sample_mandelbrot_impl<float>(h_itr,max_itr,xresolution,yresolution,startx,endx,starty,endy,verbose,stream,buffers);
+}
+
+int __declspec(dllexport) sample_julia(int * const h_itr, const double re, const double im, const int max_itr
+  , const int xresolution, const int yresolution, const double startx, const double endx, const double starty, const double endy
+  , const bool verbose, const cudaStream_t stream, cu_buffers * const buffers)
+{
+  //
+  // Determine if numbers in a given subset of the complex plane are contained within the Julia Set of a given complex number through 
+  // iteration, with CUDA acceleration in double precision
+  // see sample_julia_impl() for parameters
+  //
+
+  return sample_julia_impl<double>(h_itr,re,im,max_itr,xresolution,yresolution,startx,endx,starty,endy,verbose,stream,buffers);
+}
+
+int __declspec(dllexport) sample_julia_f32(int * const h_itr, const double re, const double im, const int max_itr
+  , const int xresolution, const int yresolution, const double startx, const double endx, const double starty, const double endy
+  , const bool verbose, const cudaStream_t stream, cu_buffers * const buffers)
+{
+  //
+  // Determine if numbers in a given subset of the complex plane are contained within the Julia Set of a given complex number through 
+  // iteration, with CUDA acceleration in single precision, which is much faster on most GPUs but only suitable at lower zoom levels
+  // see sample_julia_impl() for parameters
+  //
+
+  return sample_julia_impl<float>(h_itr,re,im,max_itr,xresolution,yresolution,startx,endx,starty,endy,verbose,stream,buffers);
+}
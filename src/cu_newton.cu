@@ -11,7 +11,8 @@
 
 #include <cu_fractal.hpp>
 
-__device__ thrust::pair<cuDoubleComplex,cuDoubleComplex> polynomial_and_deriv(const cuDoubleComplex &x, const double * const coeffs
+template <typename T>
+__device__ thrust::pair<cu_complex<T>,cu_complex<T>> polynomial_and_deriv(const cu_complex<T> &x, const T * const coeffs
   , const int degree)
 {
   //
@@ -19,9 +20,9 @@ __device__ thrust::pair<cuDoubleComplex,cuDoubleComplex> polynomial_and_deriv(co
   //
   // parameters
   // ----------
-  // x : const cuDoubleComplex &
+  // x : const cu_complex<T> &
   //  - the point to evaluate at
-  // coeffs : const double * const
+  // coeffs : const T * const
   //  - the coefficients of the polynomial given in order of the lowest degree to highest
   //    if the polynomial is written p(x)=a_n*x^(n-1)+...+a_k*x^(n-k-1)+...+a_1*x+a_0, then coeffs should have the following form:
   //      *(coeffs+0)==a_0
@@ -33,104 +34,110 @@ __device__ thrust::pair<cuDoubleComplex,cuDoubleComplex> polynomial_and_deriv(co
   //
   // returns
   // -------
-  // thrust::pair<cuDoubleComplex,cuDoubleComplex>
+  // thrust::pair<cu_complex<T>,cu_complex<T>>
   //  - the function value and derivative of the given polynomial evaluated at the given point
   //
-  cuDoubleComplex p,p_prime;
-  p=make_cuDoubleComplex(*(coeffs+degree),0.);
-  p_prime=make_cuDoubleComplex(0.,0.);
+  cu_complex<T> p,p_prime;
+  p=make_cu_complex(*(coeffs+degree),T(0));
+  p_prime=make_cu_complex(T(0),T(0));
 
   for (int itr=degree-1;itr>=0;--itr)
   {
-    p_prime=cuCadd(cuCmul(x,p_prime),p);
-    p=cuCadd(cuCmul(x,p),make_cuDoubleComplex(*(coeffs+itr),0.0));
+    p_prime=cu_add(cu_mul(x,p_prime),p);
+    p=cu_add(cu_mul(x,p),make_cu_complex(*(coeffs+itr),T(0)));
   }
 
   return thrust::make_pair(p,p_prime);
 }
 
-__device__ cuDoubleComplex newton_root(const double * const coeffs, int * const itr_taken, cuDoubleComplex x, const int degree
-  , const int max_itr, const double tol)
+template <typename T>
+__device__ cu_complex<T> newton_root(const T * const coeffs, int * const itr_taken, cu_complex<T> x, const int degree
+  , const int max_itr, const T tol)
 {
   //
   // CUDA device to apply the Newton-Raphson method to a given number to find the root of a given polynomial
   //
   // parameters
   // ----------
-  // coeffs : const double * const
+  // coeffs : const T * const
   //  - the coefficients of the polynomial given in order of the lowest degree to highest
   //    see polynomial_and_deriv() for requirements
   // itr_taken : int * const 
   //  - a poitner to write out the number of iterations needed to reach a root
-  // x : cuDoubleComplex
+  // x : cu_complex<T>
   //  - the number to a start from
   // degree : const int
   //  - the degree of the polynomial
   // max_itr : const int
   //  - the maximum number of iterations allowed
-  // tol : const double
+  // tol : const T
   //  - the tolerance within which a root will be deemed to have been reached
   //
   // returns
   // -------
-  // cuDoubleComplex
+  // cu_complex<T>
   //  - the root reached from the given number
   //
 
   for (int itr=0;itr<max_itr;++itr)
   {
     // get the current function value and derivative
-    cuDoubleComplex f_x,g_x;
-    thrust::tie(f_x,g_x)=polynomial_and_deriv(x,coeffs,degree);
+    cu_complex<T> f_x,g_x;
+    thrust::tie(f_x,g_x)=polynomial_and_deriv<T>(x,coeffs,degree);
     // converged to a root
-    if (cuCabs(f_x)<tol)
+    if (cu_abs(f_x)<tol)
     {
       *itr_taken=itr;
       return x;
     }
     // derivative is flat and we can't update
-    if (cuCreal(g_x)==0.&&cuCimag(g_x)==0.)
+    if (cu_real(g_x)==0&&cu_imag(g_x)==0)
     {
       *itr_taken=NPP_MAX_32S;
-      return make_cuDoubleComplex(CUDART_INF,CUDART_INF);
+      return make_cu_complex(static_cast<T>(CUDART_INF),static_cast<T>(CUDART_INF));
     }
     // update
-    x=cuCsub(x,cuCdiv(f_x,g_x));
+    x=cu_sub(x,cu_div(f_x,g_x));
   }
   // couldn't find a root in the given number of iterations
   *itr_taken=NPP_MAX_32S ;
-  return make_cuDoubleComplex(CUDART_INF,CUDART_INF);
+  return make_cu_complex(static_cast<T>(CUDART_INF),static_cast<T>(CUDART_INF));
 }
 
-__global__ void compute_newton(double * const d_re, double * const d_im, int * const d_itr, const double * const d_coeffs, const int max_itr
-  , const int degree, const int xresolution, const int yresolution, const double startx, const double starty, const double deltax
-  , const double deltay)
+template <typename T>
+__global__ void compute_newton(T * const d_re, T * const d_im, int * const d_itr, int * const d_ind, const T * const d_coeffs
+  , const cu_roots roots, const int max_itr, const int degree, const int xresolution, const int yresolution, const T startx
+  , const T starty, const T deltax, const T deltay, const T tol)
 {
   //
   // CUDA kernel to find the roots of a polynomial a given number in the complex plane converges to with Newton's method
   //
   // parameters
   // ----------
-  // d_re,d_im : double * const
+  // d_re,d_im : T * const
   //  - 1D flat arrays representing 2D arrays to write out the root which the numbers in the subset cnoverged to
   // d_itr : int * const
   //  - 1D flat array representing a 2D array to write out either the number of iterations needed reach a root or a marker that this root 
   //      could not be reached
-  // d_coeffs : const double * const
+  // d_ind : int * const
+  //  - 1D flat array representing a 2D array to write out the index of the root each number converged to, or -1 if no root was reached
+  // d_coeffs : const T * const
   //  - the coefficients of the polynomial given in order of the lowest degree to highest
   //    see polynomial_and_deriv() for requirements
+  // roots : const cu_roots
+  //  - the real and imaginary components of the roots of the polynomial, in double precision
   // max_itr : const int
   //  - the maximum number of iterations allowed
   // degree : const int
   //  - the degree of the polynomial
   // xresolution,yresolution : const int 
   //  - the number of steps to take in the x-direction (the real components) and the y-direction (the imaginary components)
-  // start_itr,end_itr : const int 
-  //  - the subset of the steps taken from the starting point in the y-direction (the complex component)
-  // startx,starty : const double 
+  // startx,starty : const T 
   //  - the real and imaginary components of the number defining the bottom left corner of the entire space being sampled
-  // deltax,deltay : const double 
+  // deltax,deltay : const T 
   //  - the size of the step to take in the x- and y-direction
+  // tol : const T
+  //  - the tolerance within which a root will be deemed to have been reached
   //
 
   // determine where we are in memory
@@ -139,43 +146,62 @@ __global__ void compute_newton(double * const d_re, double * const d_im, int * c
   if (idx>=xresolution||idy>=yresolution) { return; }
 
   // determine the current point
-  const double imag=starty+deltay*idy,real=startx+deltax*idx;
+  const T imag=starty+deltay*idy,real=startx+deltax*idx;
   // find the root we converge to from this point
-  cuDoubleComplex root=newton_root(d_coeffs,(d_itr+ind),make_cuDoubleComplex(real,imag),degree,max_itr,1e-6);
+  cu_complex<T> root=newton_root<T>(d_coeffs,(d_itr+ind),make_cu_complex(real,imag),degree,max_itr,tol);
 
   // write out
-  d_re[ind]=cuCreal(root);
-  d_im[ind]=cuCimag(root);
+  d_re[ind]=cu_real(root);
+  d_im[ind]=cu_imag(root);
+  // the roots are held in double precision whatever the precision of the iteration
+  d_ind[ind]=d_itr[ind]==NPP_MAX_32S ? -1
+    : closest_root(static_cast<double>(cu_real(root)),static_cast<double>(cu_imag(root)),roots.re,roots.im,degree);
 }
 
-int __declspec(dllexport) sample_newton(double * const h_re, double * const h_im, int * const h_itr, const double * const h_coeffs
-  , const int max_itr, const int degree, const int xresolution, const int yresolution, const double startx, const double endx
-  , const double starty, const double endy, const bool verbose)
+template <typename T>
+int sample_newton_impl(T * const h_re, T * const h_im, int * const h_itr, int * const h_ind, const double * const h_coeffs
+  , const double * const h_roots_re, const double * const h_roots_im, const int max_itr, const int degree, const int xresolution
+  , const int yresolution, const double startx, const double endx, const double starty, const double endy, const bool verbose
+  , const cudaStream_t stream, cu_buffers * const buffers)
 {
   //
   // Determine the roots of a polynomial the numbers in a given subset of the complex plane converge to with Newton's method, with CUDA
-  // acceleration
+  // acceleration, computing in the precision T
   //
   // parameters
   // ----------
-  // h_re,h_im : double * const
+  // h_re,h_im : T * const
   //  - 1D flat arrays representing 2D arrays to write out the root which the numbers in the subset cnoverged to
   // h_itr : int * const
   //  - 1D flat array representing a 2D array to write out either the number of iterations needed reach a root or a marker that this root 
   //      could not be reached
+  // h_ind : int * const
+  //  - 1D flat array representing a 2D array to write out the index of the root each number converged to, or -1 if no root was reached
+  //    `h_re`, `h_im`, `h_itr`, and `h_ind` should be allocated with alloc_pinned() so that the copies back from the device are 
+  //      asynchronous
   // h_coeffs : const double * const
   //  - the coefficients of the polynomial given in order of the lowest degree to highest
   //    see polynomial_and_deriv() for requirements
+  //    these are converted to the precision T on the host
+  // h_roots_re,h_roots_im : const double * const
+  //  - the real and imaginary parts of each root of the polynomial
   // max_itr : const int
   //  - the maximum number of iterations allowed
   // degree : const int
   //  - the degree of the polynomial
+  //    must be no greater than MAX_DEGREE
   // xresolution,yresolution : const int 
   //  - the number of steps to take in the x- and y-direction (the real and imaginary components)
   // startx,endx,starty,endy : const double
   //  - the first and last values to sample at 
   // verbose : bool
   //  - flag to control logging to console
+  // stream : const cudaStream_t
+  //  - the stream to queue all work on, from create_stream()
+  //    if nullptr, a stream is created for this call only
+  // buffers : cu_buffers * const
+  //  - the device memory to compute in, from init_buffers() with the same resolution and a degree no less than `degree`
+  //    if nullptr, device memory is allocated for this call only
   //
   // returns
   // -------
@@ -187,20 +213,45 @@ int __declspec(dllexport) sample_newton(double * const h_re, double * const h_im
   const double deltax=(endx-startx)/xresolution,deltay=(endy-starty)/yresolution;
   const int total=xresolution*yresolution;
   // memory parameters
-  const size_t c_size=(degree+1)*sizeof(double),d_size=total*sizeof(double),i_size=total*sizeof(int);
+  const size_t c_size=(degree+1)*sizeof(T),d_size=total*sizeof(T),i_size=total*sizeof(int);
+  // single precision can't resolve the polynomial as finely as double precision
+  const T tol=std::is_same<T,float>::value ? static_cast<T>(1e-4) : static_cast<T>(1e-6);
+  // the coefficients in the precision of the computation, which must outlive the copy to the device below
+  const std::vector<T> coeffs(h_coeffs,h_coeffs+degree+1);
 
   // device memory pointers
-  double *d_re=nullptr,*d_im=nullptr,*d_coeffs=nullptr;
-  int *d_itr=nullptr;
+  T *d_re=nullptr,*d_im=nullptr,*d_coeffs=nullptr;
+  int *d_itr=nullptr,*d_ind=nullptr;
   
-  // allocate device memory
-  CUDA_REQUIRE_SUCCESS(cudaMalloc(reinterpret_cast<void **>(&d_re),d_size));
-  CUDA_REQUIRE_SUCCESS(cudaMalloc(reinterpret_cast<void **>(&d_im),d_size));
-  CUDA_REQUIRE_SUCCESS(cudaMalloc(reinterpret_cast<void **>(&d_itr),i_size));
+  // use the given device memory, which is large enough for either precision, or allocate our own if none was given
+  if (buffers!=nullptr)
+  {
+    d_re=reinterpret_cast<T *>(buffers->d_re);
+    d_im=reinterpret_cast<T *>(buffers->d_im);
+    d_coeffs=reinterpret_cast<T *>(buffers->d_coeffs);
+    d_itr=buffers->d_itr;
+    d_ind=buffers->d_ind;
+  }
+  else
+  {
+    CUDA_REQUIRE_SUCCESS(cudaMalloc(reinterpret_cast<void **>(&d_re),d_size));
+    CUDA_REQUIRE_SUCCESS(cudaMalloc(reinterpret_cast<void **>(&d_im),d_size));
+    CUDA_REQUIRE_SUCCESS(cudaMalloc(reinterpret_cast<void **>(&d_itr),i_size));
+    CUDA_REQUIRE_SUCCESS(cudaMalloc(reinterpret_cast<void **>(&d_ind),i_size));
+    CUDA_REQUIRE_SUCCESS(cudaMalloc(reinterpret_cast<void **>(&d_coeffs),c_size));
+  }
+
+  // all work is queued on one stream and only synchronised with once the results have been copied back
+  // use the given stream, or one of our own if none was given
+  cudaStream_t work_stream=stream;
+  if (stream==nullptr) { CUDA_REQUIRE_SUCCESS(cudaStreamCreate(&work_stream)); }
 
-  CUDA_REQUIRE_SUCCESS(cudaMalloc(reinterpret_cast<void **>(&d_coeffs),c_size));
-  CUDA_REQUIRE_SUCCESS(cudaMemcpy(d_coeffs,h_coeffs,c_size,cudaMemcpyHostToDevice));
   // copy polynomial coefficients over
+  CUDA_REQUIRE_SUCCESS(cudaMemcpyAsync(d_coeffs,coeffs.data(),c_size,cudaMemcpyHostToDevice,work_stream));
+  // the roots are passed by value rather than copied to memory shared with samples on other streams
+  cu_roots roots;
+  std::copy(h_roots_re,h_roots_re+degree,roots.re);
+  std::copy(h_roots_im,h_roots_im+degree,roots.im);
 
   // GPU memory setup
   const dim3 dim_block(32,32),dim_grid((xresolution+dim_block.x-1)/dim_block.x,(yresolution+dim_block.y-1)/dim_block.y);
@@ -210,15 +261,22 @@ int __declspec(dllexport) sample_newton(double * const h_re, double * const h_im
 
   CUDA_REQUIRE_SUCCESS(cudaEventCreate(&start));
   CUDA_REQUIRE_SUCCESS(cudaEventCreate(&stop));
-  CUDA_REQUIRE_SUCCESS(cudaEventRecord(start,0));
+  CUDA_REQUIRE_SUCCESS(cudaEventRecord(start,work_stream));
   
-  compute_newton<<<dim_grid,dim_block>>>(d_re,d_im,d_itr,d_coeffs,max_itr,degree,xresolution,yresolution,startx,starty,deltax,deltay);
+  compute_newton<T><<<dim_grid,dim_block,0,work_stream>>>(d_re,d_im,d_itr,d_ind,d_coeffs,roots,max_itr,degree,xresolution
+    ,yresolution,static_cast<T>(startx),static_cast<T>(starty),static_cast<T>(deltax),static_cast<T>(deltay),tol);
   // check for errors
   CUDA_REQUIRE_SUCCESS(cudaPeekAtLastError());
-  CUDA_REQUIRE_SUCCESS(cudaDeviceSynchronize());
 
-  CUDA_REQUIRE_SUCCESS(cudaEventRecord(stop,0));
-  CUDA_REQUIRE_SUCCESS(cudaEventSynchronize(stop));
+  CUDA_REQUIRE_SUCCESS(cudaEventRecord(stop,work_stream));
+
+  // copy back to host, which is asynchronous if the host arrays are page-locked
+  CUDA_REQUIRE_SUCCESS(cudaMemcpyAsync(h_re,d_re,d_size,cudaMemcpyDeviceToHost,work_stream));
+  CUDA_REQUIRE_SUCCESS(cudaMemcpyAsync(h_im,d_im,d_size,cudaMemcpyDeviceToHost,work_stream));
+  CUDA_REQUIRE_SUCCESS(cudaMemcpyAsync(h_itr,d_itr,i_size,cudaMemcpyDeviceToHost,work_stream));
+  CUDA_REQUIRE_SUCCESS(cudaMemcpyAsync(h_ind,d_ind,i_size,cudaMemcpyDeviceToHost,work_stream));
+  CUDA_REQUIRE_SUCCESS(cudaStreamSynchronize(work_stream));
+
   CUDA_REQUIRE_SUCCESS(cudaEventElapsedTime(&elapsed,start,stop));
 
   if (verbose)
@@ -227,14 +285,295 @@ int __declspec(dllexport) sample_newton(double * const h_re, double * const h_im
       << "Time taken: " << elapsed/1000 << "s." << std::endl;
   }
 
-  CUDA_REQUIRE_SUCCESS(cudaMemcpy(h_re,d_re,d_size,cudaMemcpyDeviceToHost));
-  CUDA_REQUIRE_SUCCESS(cudaMemcpy(h_im,d_im,d_size,cudaMemcpyDeviceToHost));
-  CUDA_REQUIRE_SUCCESS(cudaMemcpy(h_itr,d_itr,i_size,cudaMemcpyDeviceToHost));
-
   // free GPU memory
-  CUDA_REQUIRE_SUCCESS(cudaFree(d_re));
-  CUDA_REQUIRE_SUCCESS(cudaFree(d_im));
-  CUDA_REQUIRE_SUCCESS(cudaFree(d_itr));
+  if (buffers==nullptr)
+  {
+    CUDA_REQUIRE_SUCCESS(cudaFree(d_re));
+    CUDA_REQUIRE_SUCCESS(cudaFree(d_im));
+    CUDA_REQUIRE_SUCCESS(cudaFree(d_itr));
+    CUDA_REQUIRE_SUCCESS(cudaFree(d_ind));
+    CUDA_REQUIRE_SUCCESS(cudaFree(d_coeffs));
+  }
+  CUDA_REQUIRE_SUCCESS(cudaEventDestroy(start));
+  CUDA_REQUIRE_SUCCESS(cudaEventDestroy(stop));
+  if (stream==nullptr) { CUDA_REQUIRE_SUCCESS(cudaStreamDestroy(work_stream)); }
 
   return NPP_MAX_32S;
 }
+
+int __declspec(dllexport) sample_newton(double * const h_re, double * const h_im, int * const h_itr, int * const h_ind
+  , const double * const h_coeffs, const double * const h_roots_re, const double * const h_roots_im, const int max_itr, const int degree
+  , const int xresolution, const int yresolution, const double startx, const double endx, const double starty, const double endy
+  , const bool verbose, const cudaStream_t stream, cu_buffers * const buffers)
+{
+  //
+  // Determine the roots of a polynomial the numbers in a given subset of the complex plane converge to with Newton's method, with CUDA
+  // acceleration in double precision
+  // see sample_newton_impl() for parameters
+  //
+
+  return sample_newton_impl<double>(h_re,h_im,h_itr,h_ind,h_coeffs,h_roots_re,h_roots_im,max_itr,degree,xresolution,yresolution,startx
+    ,endx,starty,endy,verbose,stream,buffers);
+}
+
+int __declspec(dllexport) sample_newton_f32(float * const h_re, float * const h_im, int * const h_itr, int * const h_ind
+  , const double * const h_coeffs, const double * const h_roots_re, const double * const h_roots_im, const int max_itr, const int degree
+  , const int xresolution, const int yresolution, const double startx, const double endx, const double starty, const double endy
+  , const bool verbose, const cudaStream_t stream, cu_buffers * const buffers)
+{
+  //
+  // Determine the roots of a polynomial the numbers in a given subset of the complex plane converge to with Newton's method, with CUDA
+  // acceleration in single precision, which is much faster on most GPUs but only suitable at lower zoom levels
+  // see sample_newton_impl() for parameters
+  //
+
+  return sample_newton_impl<float>(h_re,h_im,h_itr,h_ind,h_coeffs,h_roots_re,h_roots_im,max_itr,degree,xresolution,yresolution,startx
+    ,endx,starty,endy,verbose,stream,buffers);
+}
+
+__global__ void compute_root_bounds(const int * const d_ind, const int * const d_itr, int * const d_lowest, int * const d_highest
+  , const int num_roots, const int total)
+{
+  //
+  // CUDA kernel to find the fewest and most iterations taken to converge to each root
+  //
+  // parameters
+  // ----------
+  // d_ind : const int * const
+  //  - 1D flat array of the index of the root each pixel converged to, or -1 if no root was reached
+  // d_itr : const int * const
+  //  - 1D flat array of the number of iterations each pixel took to converge
+  // d_lowest,d_highest : int * const
+  //  - the fewest and most iterations taken to converge to each root, which must start at NPP_MAX_32S and 0 respectively
+  //    a root which no pixel converged to keeps these starting values
+  // num_roots : const int
+  //  - the number of roots
+  //    the kernel must be launched with 2*num_roots ints of shared memory
+  // total : const int
+  //  - the number of pixels
+  //
+
+  // the bounds of the pixels of this block are found in shared memory first, so that the bounds of each root in global memory are only
+  // contended for once per block
+  extern __shared__ int s_bounds[];
+  int * const s_lowest=s_bounds,* const s_highest=s_bounds+num_roots;
+  for (int root=threadIdx.x;root<num_roots;root+=blockDim.x)
+  {
+    s_lowest[root]=NPP_MAX_32S;
+    s_highest[root]=0;
+  }
+  __syncthreads();
+
+  // determine where we are in memory
+  const int ind=blockIdx.x*blockDim.x+threadIdx.x;
+  if (ind<total)
+  {
+    const int root=d_ind[ind];
+    if (root>=0&&root<num_roots)
+    {
+      atomicMin(s_lowest+root,d_itr[ind]);
+      atomicMax(s_highest+root,d_itr[ind]);
+    }
+  }
+  __syncthreads();
+
+  for (int root=threadIdx.x;root<num_roots;root+=blockDim.x)
+  {
+    if (s_lowest[root]<=s_highest[root])
+    {
+      atomicMin(d_lowest+root,s_lowest[root]);
+      atomicMax(d_highest+root,s_highest[root]);
+    }
+  }
+}
+
+__global__ void compute_newton_rgba(uchar4 * const d_rgba, const int * const d_ind, const int * const d_itr, const uchar4 * const d_luts
+  , const cu_scales scales, const int num_roots, const int total, const bool take_log)
+{
+  //
+  // CUDA kernel to colour each pixel of Newton's fractals by the colour scale of the root it converged to, normalised across the pixels of
+  // that root
+  //
+  // parameters
+  // ----------
+  // d_rgba : uchar4 * const
+  //  - 1D flat array to write out the colour of each pixel
+  // d_ind : const int * const
+  //  - 1D flat array of the index of the root each pixel converged to, or -1 if no root was reached
+  // d_itr : const int * const
+  //  - 1D flat array of the number of iterations each pixel took to converge
+  // d_luts : const uchar4 * const
+  //  - the colour scales, each of 256 colours from the bottom of the scale to the top
+  // scales : const cu_scales
+  //  - the colour scale of each root, and the bounds of the values shading its pixels
+  // num_roots : const int
+  //  - the number of roots
+  // total : const int
+  //  - the number of pixels
+  // take_log : const bool
+  //  - if the number of iterations should be logged, see shade()
+  //
+
+  // determine where we are in memory
+  const int ind=blockIdx.x*blockDim.x+threadIdx.x;
+  // check we haven't gone out of bounds
+  if (ind>=total) { return; }
+
+  const int root=d_ind[ind];
+  // where no roots could be found is black
+  if (root<0||root>=num_roots)
+  {
+    d_rgba[ind]=make_uchar4(0,0,0,255);
+    return;
+  }
+
+  // normalise to [0,1] and pick from the 256 colours of the scale as matplotlib does
+  // if every pixel of the root has the same value, as with matplotlib, they take the bottom of the scale
+  const float lower=scales.lower[root],upper=scales.upper[root];
+  const float scaled=upper>lower ? (shade(d_itr[ind],take_log)-lower)/(upper-lower) : 0.f;
+  const int level=min(max(static_cast<int>(scaled*256.f),0),255);
+  d_rgba[ind]=d_luts[scales.slots[root]*256+level];
+}
+
+int __declspec(dllexport) compose_newton(std::uint8_t * const h_rgba, const int * const h_ind, const int * const h_itr
+  , const std::uint8_t * const h_luts, const int num_roots, const int num_scales, const int xresolution, const int yresolution
+  , const bool take_log, const cudaStream_t stream, cu_buffers * const buffers)
+{
+  //
+  // Produce an image of Newton's fractals, with each pixel coloured by the colour scale of the root it converged to and shaded by the 
+  // number of iterations taken, normalised across the pixels of that root, with CUDA acceleration
+  //
+  // parameters
+  // ----------
+  // h_rgba : std::uint8_t * const
+  //  - 1D flat array representing a 3D array of shape (yresolution,xresolution,4) to write out the RGBA colour of each pixel
+  //    should be allocated with alloc_pinned() so that the copy back from the device is asynchronous
+  // h_ind : const int * const
+  //  - 1D flat array representing a 2D array of the index of the root each pixel converged to, or -1 if no root was reached
+  //    if nullptr, the sample left in `buffers` by sample_newton() or sample_newton_f32() is used without being copied over again
+  // h_itr : const int * const
+  //  - 1D flat array representing a 2D array of the number of iterations each pixel took to converge
+  //    must be nullptr if and only if `h_ind` is
+  // h_luts : const std::uint8_t * const
+  //  - 1D flat array representing a 3D array of shape (num_scales,256,4) of the RGBA colour scales to use
+  //    as the roots which no pixel converged to are skipped, the ith root converged to uses the ith scale
+  // num_roots : const int
+  //  - the number of roots, one more than the largest index in `h_ind`
+  //    must be no greater than MAX_DEGREE
+  // num_scales : const int
+  //  - the number of colour scales in `h_luts`
+  // xresolution,yresolution : const int 
+  //  - the number of pixels in the x- and y-direction
+  // take_log : const bool
+  //  - if the number of iterations should be logged, see shade()
+  // stream : const cudaStream_t
+  //  - the stream to queue all work on, from create_stream()
+  //    if nullptr, a stream is created for this call only
+  // buffers : cu_buffers * const
+  //  - the device memory to compute in, from init_buffers() with the same resolution and a degree greater than 0
+  //    the memory of the roots approached holds the image
+  //    its degree must be no less than `num_roots`
+  //    if nullptr, device memory is allocated for this call only, and `h_ind` and `h_itr` must be given
+  //
+  // returns
+  // -------
+  // int
+  //  - the number of roots converged to
+  //    if this is greater than `num_scales`, there are too few colour scales and `h_rgba` is left untouched
+  //
+
+  // computation parameters
+  const int total=xresolution*yresolution;
+  // memory parameters
+  const size_t i_size=total*sizeof(int),p_size=total*sizeof(uchar4),l_size=num_roots*256*sizeof(uchar4),b_size=num_roots*sizeof(int);
+  // the fewest then the most iterations taken to converge to each root, starting from the opposite extremes
+  std::vector<int> bounds(2*num_roots,0);
+  std::fill_n(bounds.begin(),num_roots,NPP_MAX_32S);
+  const int * const lowest=bounds.data(),* const highest=lowest+num_roots;
+
+  // device memory pointers
+  uchar4 *d_rgba=nullptr,*d_luts=nullptr;
+  int *d_ind=nullptr,*d_itr=nullptr,*d_bounds=nullptr;
+
+  // use the given device memory, or allocate our own if none was given
+  if (buffers!=nullptr)
+  {
+    d_rgba=reinterpret_cast<uchar4 *>(buffers->d_re);
+    d_luts=buffers->d_luts;
+    d_ind=buffers->d_ind;
+    d_itr=buffers->d_itr;
+    d_bounds=buffers->d_bounds;
+  }
+  else
+  {
+    CUDA_REQUIRE_SUCCESS(cudaMalloc(reinterpret_cast<void **>(&d_rgba),p_size));
+    CUDA_REQUIRE_SUCCESS(cudaMalloc(reinterpret_cast<void **>(&d_luts),l_size));
+    CUDA_REQUIRE_SUCCESS(cudaMalloc(reinterpret_cast<void **>(&d_ind),i_size));
+    CUDA_REQUIRE_SUCCESS(cudaMalloc(reinterpret_cast<void **>(&d_itr),i_size));
+    CUDA_REQUIRE_SUCCESS(cudaMalloc(reinterpret_cast<void **>(&d_bounds),2*b_size));
+  }
+
+  // all work is queued on one stream and only synchronised with once the results have been copied back
+  // use the given stream, or one of our own if none was given
+  cudaStream_t work_stream=stream;
+  if (stream==nullptr) { CUDA_REQUIRE_SUCCESS(cudaStreamCreate(&work_stream)); }
+
+  // copy the sample over, unless it is already on the device
+  if (h_ind!=nullptr)
+  {
+    CUDA_REQUIRE_SUCCESS(cudaMemcpyAsync(d_ind,h_ind,i_size,cudaMemcpyHostToDevice,work_stream));
+    CUDA_REQUIRE_SUCCESS(cudaMemcpyAsync(d_itr,h_itr,i_size,cudaMemcpyHostToDevice,work_stream));
+  }
+  CUDA_REQUIRE_SUCCESS(cudaMemcpyAsync(d_bounds,bounds.data(),2*b_size,cudaMemcpyHostToDevice,work_stream));
+
+  // GPU memory setup
+  const dim3 dim_block(256),dim_grid((total+dim_block.x-1)/dim_block.x);
+
+  compute_root_bounds<<<dim_grid,dim_block,2*b_size,work_stream>>>(d_ind,d_itr,d_bounds,d_bounds+num_roots,num_roots,total);
+  // check for errors
+  CUDA_REQUIRE_SUCCESS(cudaPeekAtLastError());
+
+  // the bounds are needed on the host to assign the colour scales
+  CUDA_REQUIRE_SUCCESS(cudaMemcpyAsync(bounds.data(),d_bounds,2*b_size,cudaMemcpyDeviceToHost,work_stream));
+  CUDA_REQUIRE_SUCCESS(cudaStreamSynchronize(work_stream));
+
+  // the colour scale of each root converged to, and the bounds of the values shading its pixels
+  // these are passed by value rather than copied to memory shared with compositions on other streams
+  cu_scales scales={};
+  int converged=0;
+  for (int root=0;root<num_roots;++root)
+  {
+    if (lowest[root]>highest[root]) { continue; }
+    scales.slots[root]=converged++;
+    scales.lower[root]=shade(lowest[root],take_log);
+    scales.upper[root]=shade(highest[root],take_log);
+  }
+
+  // every root converged to needs a colour scale of its own, which is left to the caller to report
+  if (converged<=num_scales)
+  {
+    // only the colour scales in use are copied over
+    CUDA_REQUIRE_SUCCESS(cudaMemcpyAsync(d_luts,h_luts,converged*256*sizeof(uchar4),cudaMemcpyHostToDevice,work_stream));
+
+    compute_newton_rgba<<<dim_grid,dim_block,0,work_stream>>>(d_rgba,d_ind,d_itr,d_luts,scales,num_roots,total,take_log);
+    // check for errors
+    CUDA_REQUIRE_SUCCESS(cudaPeekAtLastError());
+
+    // copy back to host, which is asynchronous if `h_rgba` is page-locked
+    CUDA_REQUIRE_SUCCESS(cudaMemcpyAsync(h_rgba,d_rgba,p_size,cudaMemcpyDeviceToHost,work_stream));
+    CUDA_REQUIRE_SUCCESS(cudaStreamSynchronize(work_stream));
+  }
+
+  // free GPU memory
+  if (buffers==nullptr)
+  {
+    CUDA_REQUIRE_SUCCESS(cudaFree(d_rgba));
+    CUDA_REQUIRE_SUCCESS(cudaFree(d_luts));
+    CUDA_REQUIRE_SUCCESS(cudaFree(d_ind));
+    CUDA_REQUIRE_SUCCESS(cudaFree(d_itr));
+    CUDA_REQUIRE_SUCCESS(cudaFree(d_bounds));
+  }
+  if (stream==nullptr) { CUDA_REQUIRE_SUCCESS(cudaStreamDestroy(work_stream)); }
+
+  return converged;
+}
@@ -15,62 +15,142 @@
 #define FRACTAL_H__
 
 #include <cmath>
+#include <cstdint>
+#include <immintrin.h>
+#ifdef _MSC_VER
+#include <intrin.h>
+#endif // _MSC_VER
 
+#include <atomic>
 #include <chrono>
 #include <thread>
 
 #include <common.hpp>
 
-template <typename OutputIt>
-inline OutputIt iteration_limits(const int num_threads, const int yresolution, OutputIt out)
+inline int rows_per_chunk(const int xresolution)
 {
   //
-  // Produce a list of numbers which represent successive left-closed, right-open intervals across which a particular thread will sample
-  // the complex plane
+  // Determine how many rows a thread should claim at a time when sampling the complex plane
+  // Threads claim chunks of rows as they finish their previous chunk, so that threads sampling cheap regions of the plane are not left
+  // idle while others finish expensive ones
   //
   // parameters
   // ----------
-  // num_threads : const int
-  //  - the number of threads used in the sampling
-  // yresolution : const int 
-  //  - the resolution of the sampling in the y-axis
-  // out : OutputIt
-  //  - output iterator where the limits are written
+  // xresolution : const int 
+  //  - the resolution of the sampling in the x-axis
   //
   // returns
   // -------
-  // OutputIt
-  //  - an iterator to the element past the last element added to out
+  // int
+  //  - the number of rows in a chunk, which is enough for at least 512 points, or 64 vectors of eight, so that claiming a chunk is cheap
+  //    in comparison to sampling it
   //
-  // OutputIt must meet the requirements of LegacyOutputIterator
+
+  return std::max(1,512/std::max(1,xresolution));
+}
+
+inline bool avx512_supported()
+{
+  //
+  // Determine if the AVX-512 paths can be taken, which needs both the processor to support AVX-512F and the operating system to save the
+  // AVX-512 registers
+  // The answer is found once and remembered
+  //
+  // returns
+  // -------
+  // bool
+  //  - if the AVX-512 paths can be taken
   //
 
-  const int span=yresolution/num_threads;
+  static const bool supported=[]()
+  {
+#ifdef _MSC_VER
+    int info[4];
+    // leaf 7 holds the AVX-512 feature flags
+    __cpuid(info,0);
+    if (info[0]<7) { return false; }
+    // AVX-512F is bit 16 of EBX
+    __cpuidex(info,7,0);
+    if (!(info[1]&(1<<16))) { return false; }
+    // the operating system reports which registers it saves through XGETBV, which is only available if OSXSAVE, bit 27 of ECX, is set
+    __cpuid(info,1);
+    if (!(info[2]&(1<<27))) { return false; }
+    // the SSE, AVX, opmask, and both halves of the ZMM registers must all be saved
+    return (_xgetbv(0)&0xE6)==0xE6;
+#else
+    return __builtin_cpu_supports("avx512f")!=0;
+#endif // _MSC_VER
+  }();
+
+  return supported;
+}
 
-  for (int itr=0;itr<num_threads;++itr) { *out++=span*itr; }
-  // push yresolution so that the sampling always goes as far as intended; as such, the last interval may be bigger than the rest
-  *out++=yresolution;
+inline bool avx2_supported()
+{
+  //
+  // Determine if the AVX2 paths can be taken, which needs both the processor to support AVX2 and FMA and the operating system to save the
+  // AVX registers
+  // The answer is found once and remembered
+  //
+  // returns
+  // -------
+  // bool
+  //  - if the AVX2 paths can be taken
+  //
 
-  return out;
+  static const bool supported=[]()
+  {
+#ifdef _MSC_VER
+    int info[4];
+    // leaf 7 holds the AVX2 feature flag
+    __cpuid(info,0);
+    if (info[0]<7) { return false; }
+    // AVX2 is bit 5 of EBX
+    __cpuidex(info,7,0);
+    if (!(info[1]&(1<<5))) { return false; }
+    // FMA is bit 12 of ECX, and XGETBV is only available if OSXSAVE, bit 27 of ECX, is set
+    __cpuid(info,1);
+    if (!(info[2]&(1<<12))||!(info[2]&(1<<27))) { return false; }
+    // the SSE registers and both halves of the YMM registers must be saved
+    return (_xgetbv(0)&0x6)==0x6;
+#else
+    return __builtin_cpu_supports("avx2")!=0&&__builtin_cpu_supports("fma")!=0;
+#endif // _MSC_VER
+  }();
+
+  return supported;
 }
 
 
-int iterate(std::complex<double> x, const std::complex<double> &c, const int max_itr);
-void compute_mandelbrot_range(int **iterations, const int max_itr, const int xresolution, const int start_itr, const int end_itr
-  , const double startx, const double starty, const double deltax, const double deltay, const int total, bool verbose);
-int __declspec(dllexport) sample_mandelbrot(int **iterations, const int max_itr, const int num_threads, const int xresolution
-  , const int yresolution, const double startx, const double endx, const double starty, const double endy
+std::uint16_t iterate(std::complex<double> x, const std::complex<double> &c, const int max_itr);
+int iterate_row_avx512(std::uint16_t * const row, const int max_itr, const int xresolution, const double startx, const double deltax
+  , const double imag);
+void iterate_row(std::uint16_t * const row, const int max_itr, const int xresolution, const double startx, const double deltax
+  , const double imag);
+void compute_mandelbrot_range(std::uint16_t * const iterations, const int max_itr, const int xresolution, const int yresolution
+  , std::atomic<int> &next_row, const int chunk, const double startx, const double starty, const double deltax, const double deltay
+  , const int total, bool verbose);
+int __declspec(dllexport) sample_mandelbrot(std::uint16_t * const iterations, const int max_itr, const int num_threads
+  , const int xresolution, const int yresolution, const double startx, const double endx, const double starty, const double endy
   , const bool verbose);
 
+template <int Degree=0>
 std::pair<std::complex<double>,std::complex<double>> polynomial_and_deriv(const std::complex<double> &x, double const * const coeffs
   , const int degree);
+template <int Degree=0>
 std::complex<double> newton_root( double const * const coeffs, int * const itr_taken, std::complex<double> x, const int degree
   , const int max_itr, const double tol);
-void compute_newton_range(double **re, double **im, int **iterations, double * const coeffs, const int max_itr, const int degree
-  , const int xresolution, const int start_itr, const int end_itr, const double startx, const double starty, const double deltax
+template <int Degree=0>
+void newton_root_avx2(const double * const coeffs, int * const itr_taken, double * const re, double * const im, const int degree
+  , const int max_itr, const double tol);
+template <int Degree=0>
+void compute_newton_range(double * const re, double * const im, int * const iterations, int * const idx, const double * const coeffs
+  , const double * const roots_re, const double * const roots_im, const int max_itr, const int degree, const int xresolution
+  , const int yresolution, std::atomic<int> &next_row, const int chunk, const double startx, const double starty, const double deltax
   , const double deltay, const int total, bool verbose);
-int __declspec(dllexport) sample_newton(double **re, double **im, int **iterations, double *coeffs, const int max_itr
-  , const int num_threads, const int degree, const int xresolution, const int yresolution, const double startx
-  , const double endx, const double starty, const double endy, const bool verbose);
+int __declspec(dllexport) sample_newton(double * const re, double * const im, int * const iterations, int * const idx
+  , const double * const coeffs, const double * const roots_re, const double * const roots_im, const int max_itr, const int num_threads
+  , const int degree, const int xresolution, const int yresolution, const double startx, const double endx, const double starty
+  , const double endy, const bool verbose);
 
 #endif // !FRACTAL_H__
@@ -11,7 +11,7 @@
 
 #include <fractal.hpp>
 
-int iterate(std::complex<double> x, const std::complex<double> &c, const int max_itr)
+std::uint16_t iterate(std::complex<double> x, const std::complex<double> &c, const int max_itr)
 {
   //
   // Iterate a given number under x^2 + c until its absolute value becomes greater than 2 or the maximum number of iterations is reached
@@ -28,37 +28,114 @@ int iterate(std::complex<double> x, const std::complex<double> &c, const int max
   //
   // returns
   // -------
-  // int
+  // std::uint16_t
   //  - the number of iterations needed for the aboslute value of x became greater than 2 under iteration
-  //    std::numeric_limits<int>::max() if the absolute value of x did not become greater in 2 within `max_itr` iterations
+  //    std::numeric_limits<std::uint16_t>::max() if the absolute value of x did not become greater in 2 within `max_itr` iterations
+  //    `max_itr` must be less than this marker
   //
 
+  // work on the components directly so that the arithmetic matches iterate_row() exactly
+  double re=x.real(),im=x.imag();
+
   for (int itr=0;itr<max_itr;++itr)
   {
-    if (std::abs(x)>2) { return itr; }
-    x=x*x+c;
+    const double re2=re*re,im2=im*im;
+    if (re2+im2>4.) { return static_cast<std::uint16_t>(itr); }
+    im=2.*re*im+c.imag();
+    re=re2-im2+c.real();
   }
-  return std::numeric_limits<int>::max();
+  return std::numeric_limits<std::uint16_t>::max();
 }
 
-void compute_mandelbrot_range(int **iterations, const int max_itr, const int xresolution, const int start_itr, const int end_itr
-  , const double startx, const double starty, const double deltax, const double deltay, const int total, bool verbose)
+void iterate_row(std::uint16_t * const row, const int max_itr, const int xresolution, const double startx, const double deltax
+  , const double imag)
 {
   //
-  // Determine if a given set of numbers in a given subset of the complex plane are contained within the Mandelbrot Set through iteration
-  // The given subset belongs to a larger space to actually be computed, handled by other threads
+  // Iterate every number along a row of the complex plane under x^2 + c, starting from 0, until its absolute value becomes greater than 2
+  // or the maximum number of iterations is reached
+  // Eight numbers are iterated at once with AVX-512 where the processor supports it, see iterate_row_avx512(), with any remainder
+  // iterated in lockstep without branching on the escape of each number
   //
   // parameters
   // ----------
-  // iterations : int **
-  //  - 2D array to write out either the number of iterations needed to show a number is not in the Mandelbrot Set, or a marker that this
+  // row : std::uint16_t * const
+  //  - 1D array to write out either the number of iterations needed to show a number is not in the Mandelbrot Set, or a marker that this
   //    could not be shown
   // max_itr : const int
   //  - the maximum number of iterations allowed
   // xresolution : const int 
   //  - the number of steps to take in the x-direction (the real components)
-  // start_itr,end_itr : const int 
-  //  - the subset of the steps taken from the starting point in the y-direction (the complex component)
+  // startx : const double 
+  //  - the real component of the first number in the row
+  // deltax : const double 
+  //  - the size of the step to take in the x-direction
+  // imag : const double 
+  //  - the imaginary component of every number in the row
+  //
+
+  // the AVX-512 path is compiled separately, and only taken on processors which support it
+  int jtr=avx512_supported() ? iterate_row_avx512(row,max_itr,xresolution,startx,deltax,imag) : 0;
+
+  // the remainder of the row, up to eight numbers at a time
+  // escape times differ between neighbouring numbers, so rather than each number breaking out of its own loop, which is hard to predict,
+  // every number is iterated until all have escaped, with the count of each only increased while it is bounded
+  for (;jtr<xresolution;jtr+=8)
+  {
+    const int width=std::min(8,xresolution-jtr);
+    double cr[8],zr[8]={},zi[8]={};
+    int count[8]={},bounded[8];
+    for (int ktr=0;ktr<width;++ktr)
+    {
+      cr[ktr]=startx+deltax*(jtr+ktr);
+      bounded[ktr]=1;
+    }
+
+    int any_bounded=1;
+    for (int n=0;n<max_itr&&any_bounded;++n)
+    {
+      any_bounded=0;
+      for (int ktr=0;ktr<width;++ktr)
+      {
+        // the same arithmetic as iterate()
+        const double zr2=zr[ktr]*zr[ktr],zi2=zi[ktr]*zi[ktr];
+        bounded[ktr]&=zr2+zi2<=4.;
+        count[ktr]+=bounded[ktr];
+        any_bounded|=bounded[ktr];
+        zi[ktr]=2.*zr[ktr]*zi[ktr]+imag;
+        zr[ktr]=zr2-zi2+cr[ktr];
+      }
+    }
+    // mark the numbers which never escaped
+    for (int ktr=0;ktr<width;++ktr)
+    {
+      *(row+jtr+ktr)=bounded[ktr] ? std::numeric_limits<std::uint16_t>::max() : static_cast<std::uint16_t>(count[ktr]);
+    }
+  }
+}
+
+void compute_mandelbrot_range(std::uint16_t * const iterations, const int max_itr, const int xresolution, const int yresolution
+  , std::atomic<int> &next_row, const int chunk, const double startx, const double starty, const double deltax, const double deltay
+  , const int total, bool verbose)
+{
+  //
+  // Determine if a given set of numbers in a given subset of the complex plane are contained within the Mandelbrot Set through iteration
+  // The rows of the space are shared with other threads, and claimed a chunk at a time
+  //
+  // parameters
+  // ----------
+  // iterations : std::uint16_t * const
+  //  - 1D flat array representing a row-major 2D array to write out either the number of iterations needed to show a number is not in the
+  //    Mandelbrot Set, or a marker that this could not be shown
+  // max_itr : const int
+  //  - the maximum number of iterations allowed
+  // xresolution : const int 
+  //  - the number of steps to take in the x-direction (the real components)
+  // yresolution : const int 
+  //  - the number of steps to take in the y-direction (the imaginary components)
+  // next_row : std::atomic<int> &
+  //  - the next row which has not yet been claimed by any thread, shared between all threads
+  // chunk : const int 
+  //  - the number of rows to claim at a time, see rows_per_chunk()
   // startx,starty : const int 
   //  - the real and imaginary components of the number defining the bottom left corner of the entire space being sampled
   // deltax,deltay : const int 
@@ -70,25 +147,24 @@ void compute_mandelbrot_range(int **iterations, const int max_itr, const int xre
   //  - flag to control logging to console
   //
 
-  const std::complex<double> init(0.,0.);
-  
-  // loop over the given subset of imaginary components
-  for (int itr=start_itr;itr<end_itr;++itr)
+  // claim chunks of imaginary components until there are none left
+  for (int start_itr=next_row.fetch_add(chunk);start_itr<yresolution;start_itr=next_row.fetch_add(chunk))
   {
-    double imag=starty+deltay*itr;
-    // loop over all real components
-    for (int jtr=0;jtr<xresolution;++jtr)
+    const int end_itr=std::min(start_itr+chunk,yresolution);
+    for (int itr=start_itr;itr<end_itr;++itr)
     {
-      double real=startx+deltax*jtr;
-      // determine the number of iterations
-      *(*(iterations+itr)+jtr)=iterate(init,std::complex<double>(real,imag),max_itr);
+      double imag=starty+deltay*itr;
+      // determine the number of iterations for all real components
+      iterate_row(iterations+static_cast<std::size_t>(itr)*xresolution,max_itr,xresolution,startx,deltax,imag);
+      if (verbose&&itr%100==0&&itr!=0) { std::cout << "Processed " << itr*xresolution << " points of " << total << "." << std::endl; }
     }
-    if (verbose&&itr%100==0&&itr!=0) { std::cout << "Processed " << itr*xresolution << " points of " << total << "." << std::endl; }
   }
+  // make the non-temporal stores of iterate_row() visible before this thread is joined
+  _mm_sfence();
 }
 
-int __declspec(dllexport) sample_mandelbrot(int **iterations, const int max_itr, const int num_threads, const int xresolution
-  , const int yresolution, const double startx, const double endx, const double starty, const double endy
+int __declspec(dllexport) sample_mandelbrot(std::uint16_t * const iterations, const int max_itr, const int num_threads
+  , const int xresolution, const int yresolution, const double startx, const double endx, const double starty, const double endy
   , const bool verbose)
 {
   //
@@ -96,11 +172,13 @@ int __declspec(dllexport) sample_mandelbrot(int **iterations, const int max_itr,
   //
   // parameters
   // ----------
-  // iterations : int **
-  //  - 2D array to write out either the number of iterations needed to show a number is not in the Mandelbrot Set, or a marker that this
-  //    could not be shown
+  // iterations : std::uint16_t * const
+  //  - 1D flat array representing a row-major 2D array to write out either the number of iterations needed to show a number is not in the
+  //    Mandelbrot Set, or a marker that this could not be shown
+  //    rows are written fastest if `iterations` is 64-byte aligned and `xresolution` is a multiple of eight
   // max_itr : const int
   //  - the maximum number of iterations allowed
+  //    must be less than std::numeric_limits<std::uint16_t>::max()
   // num_threads : const int
   //  - the number of threads to use in computation
   // xresolution,yresolution : const int 
@@ -120,16 +198,16 @@ int __declspec(dllexport) sample_mandelbrot(int **iterations, const int max_itr,
   const double deltax=(endx-startx)/xresolution,deltay=(endy-starty)/yresolution;
   const int total=xresolution*yresolution;
 
-  // get the split in the y-direction to allocate to the threads
-  std::vector<int> increments;
-  iteration_limits(num_threads,yresolution,std::back_inserter(increments));
+  // rows are handed out to the threads in chunks as they become free, as the cost of a row varies greatly across the plane
+  std::atomic<int> next_row(0);
+  const int chunk=rows_per_chunk(xresolution);
 
-  // construct all threads, where each thread takes a new left-closed, right-open interval of the imaginary component of the plane
+  // construct all threads, where each thread repeatedly claims the next chunk of rows until none are left
   std::vector<std::thread> threads;
-  for (int itr=0;itr<increments.size()-1;++itr)
+  for (int itr=0;itr<num_threads;++itr)
   {
     threads.push_back(std::thread(
-      compute_mandelbrot_range,iterations,max_itr,xresolution,increments[itr],increments[itr+1],startx,starty,deltax,deltay,total
+      compute_mandelbrot_range,iterations,max_itr,xresolution,yresolution,std::ref(next_row),chunk,startx,starty,deltax,deltay,total
         ,num_threads>1 ? false : verbose
     ));
   }
@@ -148,5 +226,5 @@ int __declspec(dllexport) sample_mandelbrot(int **iterations, const int max_itr,
     std::cout << "Time taken: " << elapsed.count() << "s." << std::endl;
   }
 
-  return std::numeric_limits<int>::max();
+  return std::numeric_limits<std::uint16_t>::max();
 }
@@ -0,0 +1,74 @@
+
+//+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+//
+//                                                                                                                                       //
+// mandelbrot_avx512.cpp                                                                                                                 //
+//                                                                                                                                       //
+// D. C. Groothuizen Dijkema - January, 2020                                                                                             //
+//+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+//
+
+// The AVX-512 path for producing fractals from the Mandelbrot Set, which is the only file compiled for AVX-512 so that the rest of the
+// library runs on any x64 processor
+// fractal.hpp is deliberately not included, as any inline function from it compiled here could be the copy the linker keeps
+
+
+#include <cstdint>
+#include <limits>
+#include <immintrin.h>
+
+int iterate_row_avx512(std::uint16_t * const row, const int max_itr, const int xresolution, const double startx, const double deltax
+  , const double imag)
+{
+  //
+  // Iterate the numbers along a row of the complex plane under x^2 + c, starting from 0, eight at a time with AVX-512, until the absolute
+  // value of each becomes greater than 2 or the maximum number of iterations is reached
+  // Only call this if avx512_supported()
+  // If `row` is 16-byte aligned, the counts of each eight numbers are written with a non-temporal store, as the counts are not read again
+  // here; the caller must issue _mm_sfence() before the counts are read by another thread
+  //
+  // parameters
+  // ----------
+  // see iterate_row()
+  //
+  // returns
+  // -------
+  // int
+  //  - the number of numbers at the start of the row which were iterated, a multiple of eight
+  //    the rest of the row is left to the caller
+  //
+
+  int jtr=0;
+
+#ifdef __AVX512F__
+  const __m512d two=_mm512_set1_pd(2.),four=_mm512_set1_pd(4.),ci=_mm512_set1_pd(imag);
+  const __m512d start=_mm512_set1_pd(startx),delta=_mm512_set1_pd(deltax),lanes=_mm512_set_pd(7.,6.,5.,4.,3.,2.,1.,0.);
+  const __m512i one=_mm512_set1_epi64(1),marker=_mm512_set1_epi64(std::numeric_limits<std::uint16_t>::max());
+  // eight counts make 16 bytes, so every store is aligned if the start of the row is
+  const bool aligned=reinterpret_cast<std::uintptr_t>(row)%16==0;
+
+  for (;jtr+8<=xresolution;jtr+=8)
+  {
+    // the real components of the eight numbers, computed as startx+deltax*jtr to match the scalar path
+    const __m512d cr=_mm512_add_pd(start,_mm512_mul_pd(_mm512_add_pd(_mm512_set1_pd(jtr),lanes),delta));
+    __m512d zr=_mm512_setzero_pd(),zi=_mm512_setzero_pd();
+    __m512i itr=_mm512_setzero_si512();
+    // lanes whose absolute value has not yet become greater than 2
+    __mmask8 bounded=0xFF;
+
+    // a single counter bounds the iteration; lanes which have escaped simply stop counting
+    for (int n=0;n<max_itr&&bounded;++n)
+    {
+      const __m512d zr2=_mm512_mul_pd(zr,zr),zi2=_mm512_mul_pd(zi,zi);
+      bounded=_mm512_mask_cmp_pd_mask(bounded,_mm512_add_pd(zr2,zi2),four,_CMP_LE_OQ);
+      itr=_mm512_mask_add_epi64(itr,bounded,itr,one);
+      zi=_mm512_fmadd_pd(_mm512_mul_pd(zr,zi),two,ci);
+      zr=_mm512_add_pd(_mm512_sub_pd(zr2,zi2),cr);
+    }
+    // mark the lanes which never escaped
+    itr=_mm512_mask_mov_epi64(itr,bounded,marker);
+    if (aligned) { _mm_stream_si128(reinterpret_cast<__m128i *>(row+jtr),_mm512_cvtepi64_epi16(itr)); }
+    else { _mm_storeu_si128(reinterpret_cast<__m128i *>(row+jtr),_mm512_cvtepi64_epi16(itr)); }
+  }
+#endif // __AVX512F__
+
+  return jtr;
+}
@@ -11,11 +11,14 @@
 
 #include <fractal.hpp>
 
+template <int Degree>
 std::pair<std::complex<double>,std::complex<double>> polynomial_and_deriv(const std::complex<double> &x, const double * const coeffs
   , const int degree)
 {
   //
   // Evaluate the value and derivative of a polynomial at a point using Horner's method
+  // See newton_avx2.cpp for the AVX2 path
+  // If Degree is not 0, it is the degree of the polynomial, fixed at compile time so that the loop over the coefficients can be unrolled
   //
   // parameters
   // ----------
@@ -30,6 +33,7 @@ std::pair<std::complex<double>,std::complex<double>> polynomial_and_deriv(const
   //      *(coeffs+n)==a_n
   // degree : const int
   //  - the degree of the polynomial
+  //    only used if Degree is 0
   //
   // returns
   // -------
@@ -37,9 +41,11 @@ std::pair<std::complex<double>,std::complex<double>> polynomial_and_deriv(const
   //  - the function value and derivative of the given polynomial evaluated at the given point
   //
 
-  std::complex<double> p=*(coeffs+degree),p_prime=0;
+  const int n=Degree>0 ? Degree : degree;
 
-  for (int itr=degree-1;itr>=0;--itr)
+  std::complex<double> p=*(coeffs+n),p_prime=0;
+
+  for (int itr=n-1;itr>=0;--itr)
   {
     p_prime=x*p_prime+p;
     p=x*p+*(coeffs+itr);
@@ -48,11 +54,13 @@ std::pair<std::complex<double>,std::complex<double>> polynomial_and_deriv(const
   return std::make_pair(p,p_prime);
 }
 
+template <int Degree>
 std::complex<double> newton_root(const double * const coeffs, int * const itr_taken, std::complex<double> x, const int degree
   , const int max_itr, const double tol)
 {
   //
   // Apply the Newton-Raphson method to a given number to find the root of a given polynomial
+  // If Degree is not 0, it is the degree of the polynomial, see polynomial_and_deriv()
   //
   // parameters
   // ----------
@@ -80,7 +88,7 @@ std::complex<double> newton_root(const double * const coeffs, int * const itr_ta
   {
     // get the current function value and derivative
     std::complex<double> f_x,g_x;
-    std::tie(f_x,g_x)=polynomial_and_deriv(x,coeffs,degree);
+    std::tie(f_x,g_x)=polynomial_and_deriv<Degree>(x,coeffs,degree);
     // converged to a root
     if (abs(f_x)<tol)
     {
@@ -101,31 +109,44 @@ std::complex<double> newton_root(const double * const coeffs, int * const itr_ta
   return std::complex<double>(std::numeric_limits<double>::infinity(),std::numeric_limits<double>::infinity());
 }
 
-void compute_newton_range(double **re, double **im, int **iterations, double * const coeffs, const int max_itr, const int degree
-  , const int xresolution, const int start_itr, const int end_itr, const double startx, const double starty, const double deltax
+template <int Degree>
+void compute_newton_range(double * const re, double * const im, int * const iterations, int * const idx, const double * const coeffs
+  , const double * const roots_re, const double * const roots_im, const int max_itr, const int degree, const int xresolution
+  , const int yresolution, std::atomic<int> &next_row, const int chunk, const double startx, const double starty, const double deltax
   , const double deltay, const int total, bool verbose)
 {
   //
   // Find the roots of a polynomial a given set of numbers in a given subset of the complex plane converge to with Newton's method
-  // The given subset belongs to a larger space to actually be computed, handled by other threads
+  // The rows of the space are shared with other threads, and claimed a chunk at a time
+  // If Degree is not 0, it is the degree of the polynomial, see polynomial_and_deriv()
   //
   // parameters
   // ----------
-  // re,im : double **
-  //  - 2D arrays to write out the root which the numbers in the subset cnoverged to
-  // iterations : int **
-  //  - 2D array to write out either the number of iterations needed reach a root or a marker that this root could not be reached
-  // coeffs : double * const
+  // re,im : double * const
+  //  - 1D flat arrays representing row-major 2D arrays to write out the root which the numbers in the subset cnoverged to
+  // iterations : int * const
+  //  - 1D flat array representing a row-major 2D array to write out either the number of iterations needed reach a root or a marker that
+  //    this root could not be reached
+  // idx : int * const
+  //  - 1D flat array representing a row-major 2D array to write out the index of the root each number converged to, or -1 if no root was
+  //    reached
+  // coeffs : const double * const
   //  - the coefficients of the polynomial given in order of the lowest degree to highest
   //    see polynomial_and_deriv() for requirements
+  // roots_re,roots_im : const double * const
+  //  - the real and imaginary parts of each root of the polynomial
   // max_itr : const int
   //  - the maximum number of iterations allowed
   // degree : const int
   //  - the degree of the polynomial
   // xresolution : const int 
   //  - the number of steps to take in the x-direction (the real components)
-  // start_itr,end_itr : const int 
-  //  - the subset of the steps taken from the starting point in the y-direction (the complex component)
+  // yresolution : const int 
+  //  - the number of steps to take in the y-direction (the imaginary components)
+  // next_row : std::atomic<int> &
+  //  - the next row which has not yet been claimed by any thread, shared between all threads
+  // chunk : const int 
+  //  - the number of rows to claim at a time, see rows_per_chunk()
   // startx,starty : const double 
   //  - the real and imaginary components of the number defining the bottom left corner of the entire space being sampled
   // deltax,deltay : const double 
@@ -137,39 +158,67 @@ void compute_newton_range(double **re, double **im, int **iterations, double * c
   //  - flag to control logging to console
   //
 
-  // loop over the given subset of imaginary components
-  for (int itr=start_itr;itr<end_itr;++itr)
+  // the AVX2 path is chosen once, rather than for every point
+  const bool avx2=avx2_supported();
+
+  // claim chunks of imaginary components until there are none left
+  for (int start_itr=next_row.fetch_add(chunk);start_itr<yresolution;start_itr=next_row.fetch_add(chunk))
   {
-    double imag=starty+deltay*itr;
-    // loop over all real components
-    for (int jtr=0;jtr<xresolution;++jtr)
+    const int end_itr=std::min(start_itr+chunk,yresolution);
+    for (int itr=start_itr;itr<end_itr;++itr)
     {
-      double real=startx+deltax*jtr;
-      // determine the root reached and the number of iterations to get there
-      std::complex<double> root=newton_root(coeffs,(*(iterations+itr)+jtr),std::complex<double>(real,imag),degree,max_itr,1e-6);
-      *(*(re+itr)+jtr)=root.real();
-      *(*(im+itr)+jtr)=root.imag();
+      double imag=starty+deltay*itr;
+      // the start of this row in the flat arrays
+      const std::size_t row=static_cast<std::size_t>(itr)*xresolution;
+      // loop over all real components
+      for (int jtr=0;jtr<xresolution;++jtr)
+      {
+        double real=startx+deltax*jtr;
+        const std::size_t ind=row+jtr;
+        // determine the root reached and the number of iterations to get there
+        if (avx2)
+        {
+          *(re+ind)=real;
+          *(im+ind)=imag;
+          newton_root_avx2<Degree>(coeffs,iterations+ind,re+ind,im+ind,degree,max_itr,1e-6);
+        }
+        else
+        {
+          std::complex<double> root=newton_root<Degree>(coeffs,iterations+ind,std::complex<double>(real,imag),degree,max_itr,1e-6);
+          *(re+ind)=root.real();
+          *(im+ind)=root.imag();
+        }
+        // determine which root was reached while the result is still at hand
+        *(idx+ind)=*(iterations+ind)==std::numeric_limits<int>::max() ? -1 : closest_root(*(re+ind),*(im+ind),roots_re,roots_im,degree);
+      }
+      if (verbose&&itr%100==0&&itr!=0) { std::cout << "Processed " << itr*xresolution << " points of " << total << "." << std::endl; }
     }
-    if (verbose&&itr%100==0&&itr!=0) { std::cout << "Processed " << itr*xresolution << " points of " << total << "." << std::endl; }
   }
 }
 
-int __declspec(dllexport) sample_newton(double **re, double **im, int **iterations, double *coeffs, const int max_itr
-  , const int num_threads, const int degree, const int xresolution, const int yresolution, const double startx
-  , const double endx, const double starty, const double endy, const bool verbose)
+int __declspec(dllexport) sample_newton(double * const re, double * const im, int * const iterations, int * const idx
+  , const double * const coeffs, const double * const roots_re, const double * const roots_im, const int max_itr, const int num_threads
+  , const int degree, const int xresolution, const int yresolution, const double startx, const double endx, const double starty
+  , const double endy, const bool verbose)
 {
   //
   // Determine the roots of a polynomial the numbers in a given subset of the complex plane converge to with Newton's method
   //
   // parameters
   // ----------
-  // re,im : double **
-  //  - 2D arrays to write out the root which the numbers in the subset cnoverged to
-  // iterations : int **
-  //  - 2D array to write out either the number of iterations needed reach a root or a marker that this root could not be reached
-  // coeffs : double *
+  // re,im : double * const
+  //  - 1D flat arrays representing row-major 2D arrays to write out the root which the numbers in the subset cnoverged to
+  // iterations : int * const
+  //  - 1D flat array representing a row-major 2D array to write out either the number of iterations needed reach a root or a marker that
+  //    this root could not be reached
+  // idx : int * const
+  //  - 1D flat array representing a row-major 2D array to write out the index of the root each number converged to, or -1 if no root was
+  //    reached
+  // coeffs : const double * const
   //  - the coefficients of the polynomial given in order of the lowest degree to highest
   //    see polynomial_and_deriv() for requirements
+  // roots_re,roots_im : const double * const
+  //  - the real and imaginary parts of each root of the polynomial
   // max_itr : const int
   //  - the maximum number of iterations allowed
   // degree : const int
@@ -193,17 +242,35 @@ int __declspec(dllexport) sample_newton(double **re, double **im, int **iteratio
   const double deltax=(endx-startx)/xresolution,deltay=(endy-starty)/yresolution;
   const int total=xresolution*yresolution;
 
-  // get the split in the y-direction to allocate to the threads
-  std::vector<int> increments;
-  iteration_limits(num_threads,yresolution,std::back_inserter(increments));
+  // rows are handed out to the threads in chunks as they become free, as the cost of a row varies greatly across the plane
+  std::atomic<int> next_row(0);
+  const int chunk=rows_per_chunk(xresolution);
 
-  // construct all threads, where each thread takes a new left-closed, right-open interval of the imaginary component of the plane
+  // polynomials of low degree are the most commonly sampled, so Newton's method is compiled for each of these degrees specifically, which
+  // unrolls the evaluation of the polynomial, and only higher degrees fall back to a loop over the coefficients
+  void (*compute_range)(double * const, double * const, int * const, int * const, const double * const, const double * const
+    , const double * const, const int, const int, const int, const int, std::atomic<int> &, const int, const double, const double
+    , const double, const double, const int, bool);
+  switch (degree)
+  {
+    case 1: compute_range=compute_newton_range<1>; break;
+    case 2: compute_range=compute_newton_range<2>; break;
+    case 3: compute_range=compute_newton_range<3>; break;
+    case 4: compute_range=compute_newton_range<4>; break;
+    case 5: compute_range=compute_newton_range<5>; break;
+    case 6: compute_range=compute_newton_range<6>; break;
+    case 7: compute_range=compute_newton_range<7>; break;
+    case 8: compute_range=compute_newton_range<8>; break;
+    default: compute_range=compute_newton_range<0>;
+  }
+
+  // construct all threads, where each thread repeatedly claims the next chunk of rows until none are left
   std::vector<std::thread> threads;
-  for (int itr=0;itr<increments.size()-1;++itr)
+  for (int itr=0;itr<num_threads;++itr)
   {
     threads.push_back(std::thread(
-      compute_newton_range,re,im,iterations,std::ref(coeffs),max_itr,degree,xresolution,increments[itr],increments[itr+1],startx,starty
-        ,deltax,deltay,total,num_threads>1 ? false : verbose
+      compute_range,re,im,iterations,idx,coeffs,roots_re,roots_im,max_itr,degree,xresolution,yresolution
+        ,std::ref(next_row),chunk,startx,starty,deltax,deltay,total,num_threads>1 ? false : verbose
     ));
   }
 
@@ -223,3 +290,9 @@ int __declspec(dllexport) sample_newton(double **re, double **im, int **iteratio
 
   return std::numeric_limits<int>::max();
 }
+
+// the general forms are also used directly, outside of sample_newton()
+template std::pair<std::complex<double>,std::complex<double>> polynomial_and_deriv<0>(const std::complex<double> &x
+  , const double * const coeffs, const int degree);
+template std::complex<double> newton_root<0>(const double * const coeffs, int * const itr_taken, std::complex<double> x
+  , const int degree, const int max_itr, const double tol);
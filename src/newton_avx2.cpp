@@ -0,0 +1,151 @@
+//+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+//
+//                                                                                                                                       //
+// newton_avx2.cpp                                                                                                                       //
+//                                                                                                                                       //
+// D. C. Groothuizen Dijkema - January, 2020                                                                                             //
+//+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+//
+
+// The AVX2 path for producing Newton's fractals, which is the only file compiled for AVX2 so that the rest of the library runs on any x64
+// processor
+// fractal.hpp is deliberately not included, and std::complex is not used, as any inline function compiled here could be the copy the
+// linker keeps
+
+
+#include <limits>
+#include <immintrin.h>
+
+// the markers of a point from which no root could be reached, as in newton_root()
+constexpr double no_root=std::numeric_limits<double>::infinity();
+constexpr int no_itr=std::numeric_limits<int>::max();
+
+template <int Degree>
+void polynomial_and_deriv_avx2(double * const out, const double x_re, const double x_im, const double * const coeffs, const int degree)
+{
+  //
+  // Evaluate the value and derivative of a polynomial at a point using Horner's method, with both evaluated together with AVX2
+  // If Degree is not 0, it is the degree of the polynomial, see polynomial_and_deriv()
+  //
+  // parameters
+  // ----------
+  // out : double * const
+  //  - array of four to write out the function value and derivative as [p.re,p.im,p_prime.re,p_prime.im]
+  // x_re,x_im : const double
+  //  - the real and imaginary parts of the point to evaluate at
+  // coeffs : const double * const
+  //  - the coefficients of the polynomial given in order of the lowest degree to highest
+  //    see polynomial_and_deriv() for requirements
+  // degree : const int
+  //  - the degree of the polynomial
+  //    only used if Degree is 0
+  //
+
+  const int n=Degree>0 ? Degree : degree;
+
+#ifdef __AVX2__
+  // hold the value and derivative in one register as [p.re,p.im,p_prime.re,p_prime.im] so a single complex multiply by x updates both
+  const __m256d xr=_mm256_set1_pd(x_re),xi=_mm256_set1_pd(x_im);
+  __m256d p=_mm256_set_pd(0.,0.,0.,*(coeffs+n));
+
+  for (int itr=n-1;itr>=0;--itr)
+  {
+    // x*[p,p_prime], with the real parts subtracted and imaginary parts added by the fused multiply
+    const __m256d prod=_mm256_fmaddsub_pd(xr,p,_mm256_mul_pd(xi,_mm256_shuffle_pd(p,p,0x5)));
+    // p_prime=x*p_prime+p and p=x*p+a_k, where the old p is moved into the upper half
+    p=_mm256_add_pd(prod,_mm256_add_pd(_mm256_permute2f128_pd(p,p,0x08),_mm256_set_pd(0.,0.,0.,*(coeffs+itr))));
+  }
+
+  _mm256_storeu_pd(out,p);
+#else
+  double p_re=*(coeffs+n),p_im=0.,d_re=0.,d_im=0.;
+
+  for (int itr=n-1;itr>=0;--itr)
+  {
+    const double next_d_re=x_re*d_re-x_im*d_im+p_re,next_d_im=x_re*d_im+x_im*d_re+p_im;
+    const double next_p_re=x_re*p_re-x_im*p_im+*(coeffs+itr),next_p_im=x_re*p_im+x_im*p_re;
+    d_re=next_d_re;
+    d_im=next_d_im;
+    p_re=next_p_re;
+    p_im=next_p_im;
+  }
+
+  out[0]=p_re;
+  out[1]=p_im;
+  out[2]=d_re;
+  out[3]=d_im;
+#endif // __AVX2__
+}
+
+template <int Degree>
+void newton_root_avx2(const double * const coeffs, int * const itr_taken, double * const re, double * const im, const int degree
+  , const int max_itr, const double tol)
+{
+  //
+  // Apply the Newton-Raphson method to a given number to find the root of a given polynomial, as newton_root() does, with the polynomial
+  // evaluated with AVX2
+  // Only call this if avx2_supported()
+  // If Degree is not 0, it is the degree of the polynomial, see polynomial_and_deriv()
+  //
+  // parameters
+  // ----------
+  // coeffs : const double * const
+  //  - the coefficients of the polynomial given in order of the lowest degree to highest
+  //    see polynomial_and_deriv() for requirements
+  // itr_taken : int * const
+  //  - a pointer to write out the number of iterations needed to reach a root
+  // re,im : double * const
+  //  - pointers to the real and imaginary parts of the number to start from, which are overwritten with the root reached
+  // degree : const int
+  //  - the degree of the polynomial
+  // max_itr : const int
+  //  - the maximum number of iterations allowed
+  // tol : const double
+  //  - the tolerance within which a root will be deemed to have been reached
+  //
+
+  double x_re=*re,x_im=*im,out[4];
+
+  for (int itr=0;itr<max_itr;++itr)
+  {
+    // get the current function value and derivative
+    polynomial_and_deriv_avx2<Degree>(out,x_re,x_im,coeffs,degree);
+    const double f_re=out[0],f_im=out[1],g_re=out[2],g_im=out[3];
+    // converged to a root
+    if (f_re*f_re+f_im*f_im<tol*tol)
+    {
+      *itr_taken=itr;
+      *re=x_re;
+      *im=x_im;
+      return;
+    }
+    // derivative is flat and we can't update
+    const double g_norm=g_re*g_re+g_im*g_im;
+    if (g_norm==0.) { break; }
+    // update
+    x_re-=(f_re*g_re+f_im*g_im)/g_norm;
+    x_im-=(f_im*g_re-f_re*g_im)/g_norm;
+  }
+  // couldn't find a root
+  *itr_taken=no_itr;
+  *re=no_root;
+  *im=no_root;
+}
+
+// the degrees sample_newton() compiles Newton's method for
+template void newton_root_avx2<0>(const double * const coeffs, int * const itr_taken, double * const re, double * const im
+  , const int degree, const int max_itr, const double tol);
+template void newton_root_avx2<1>(const double * const coeffs, int * const itr_taken, double * const re, double * const im
+  , const int degree, const int max_itr, const double tol);
+template void newton_root_avx2<2>(const double * const coeffs, int * const itr_taken, double * const re, double * const im
+  , const int degree, const int max_itr, const double tol);
+template void newton_root_avx2<3>(const double * const coeffs, int * const itr_taken, double * const re, double * const im
+  , const int degree, const int max_itr, const double tol);
+template void newton_root_avx2<4>(const double * const coeffs, int * const itr_taken, double * const re, double * const im
+  , const int degree, const int max_itr, const double tol);
+template void newton_root_avx2<5>(const double * const coeffs, int * const itr_taken, double * const re, double * const im
+  , const int degree, const int max_itr, const double tol);
+template void newton_root_avx2<6>(const double * const coeffs, int * const itr_taken, double * const re, double * const im
+  , const int degree, const int max_itr, const double tol);
+template void newton_root_avx2<7>(const double * const coeffs, int * const itr_taken, double * const re, double * const im
+  , const int degree, const int max_itr, const double tol);
+template void newton_root_avx2<8>(const double * const coeffs, int * const itr_taken, double * const re, double * const im
+  , const int degree, const int max_itr, const double tol);
@@ -40,10 +40,6 @@ void __declspec(dllexport) assign_roots(int * const idx, const double * const re
   //  - flag to control logging to console
   //
 
-  // get a list of all roots, formed from the input vectors giving the real and imaginary components of the roots
-  std::vector<std::complex<double>> roots;
-  zip(roots_re,roots_re+degree,roots_im,roots_im+degree,std::back_inserter(roots));
-
   const int total=xresolution*yresolution;
   
   for (int itr=0;itr<total;++itr)
@@ -55,14 +51,7 @@ void __declspec(dllexport) assign_roots(int * const idx, const double * const re
       continue;
     }
 
-    std::complex<double> val(re[itr],im[itr]);
-    // determine the difference between the current value and all roots
-    std::vector<std::complex<double>> diffs;
-    std::transform(std::begin(roots),std::end(roots),std::back_inserter(diffs)
-      ,[val](std::complex<double> root) { return abs(root-val); });
-    // find the argmin of the differences, and, therefore, which root was converged to
-    idx[itr]=static_cast<int>(argmin(std::cbegin(diffs),std::cend(diffs)
-      ,[](const std::complex<double> &x, const std::complex<double> &y){ return abs(x)<abs(y); }
-    ));
+    // find which root was converged to
+    idx[itr]=closest_root(re[itr],im[itr],roots_re,roots_im,degree);
   }
 }
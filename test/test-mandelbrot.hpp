@@ -0,0 +1,54 @@
+
+//+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+//
+//                                                                                                                                       //
+// test-mandelbrot.hpp                                                                                                                   //
+//                                                                                                                                       //
+// D. C. Groothuizen Dijkema - January, 2020                                                                                             //
+//+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+//
+
+// Test file for the Mandelbrot Set
+
+
+#include <fractal.hpp>
+
+namespace MandelbrotTesting
+{
+BOOST_AUTO_TEST_SUITE(test_mandelbrot)
+
+  BOOST_AUTO_TEST_CASE(iterate_testing)
+  {
+    const std::complex<double> init(0.,0.);
+
+    // inside the set
+    BOOST_CHECK(iterate(init,std::complex<double>(0.,0.),100)==std::numeric_limits<std::uint16_t>::max());
+    BOOST_CHECK(iterate(init,std::complex<double>(-1.,0.),100)==std::numeric_limits<std::uint16_t>::max());
+    // outside the set
+    BOOST_CHECK(iterate(init,std::complex<double>(3.,0.),100)==1);
+    BOOST_CHECK(iterate(init,std::complex<double>(1.,0.),100)==3);
+  }
+
+  BOOST_AUTO_TEST_CASE(iterate_row_testing)
+  {
+    // a resolution which is not a multiple of the vector width, so that the remainder is also exercised
+    const int xresolution=37,max_itr=200;
+    const double startx=-2.,deltax=2.5/xresolution;
+    std::vector<std::uint16_t> row(xresolution);
+
+    std::random_device rd;
+    std::mt19937_64 gen(rd());
+    std::uniform_real_distribution<double> dist(-1.5,1.5);
+
+    for (int itr=0;itr<100;++itr)
+    {
+      const double imag=dist(gen);
+      iterate_row(row.data(),max_itr,xresolution,startx,deltax,imag);
+
+      for (int jtr=0;jtr<xresolution;++jtr)
+      {
+        BOOST_CHECK(row[jtr]==iterate(std::complex<double>(0.,0.),std::complex<double>(startx+deltax*jtr,imag),max_itr));
+      }
+    }
+  }
+
+BOOST_AUTO_TEST_SUITE_END()
+} // namespace MandelbrotTesting
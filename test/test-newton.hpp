@@ -120,5 +120,75 @@ BOOST_AUTO_TEST_SUITE(test_newton)
     BOOST_CHECK(argmin(std::cbegin(test_vec),std::cend(test_vec),[](const std::complex<double> &x, const std::complex<double> &y){ return abs(x)<abs(y); })==2);
   }
 
+  BOOST_AUTO_TEST_CASE(closest_root_testing)
+  {
+    const int degree=3;
+    double roots_re[degree]={1.,-0.5,-0.5},roots_im[degree]={0.,0.866,-0.866};
+
+    BOOST_CHECK(closest_root(1.,0.,roots_re,roots_im,degree)==0);
+    BOOST_CHECK(closest_root(0.9,0.1,roots_re,roots_im,degree)==0);
+    BOOST_CHECK(closest_root(-1.,1.,roots_re,roots_im,degree)==1);
+    BOOST_CHECK(closest_root(-0.4,-0.9,roots_re,roots_im,degree)==2);
+  }
+
+  BOOST_AUTO_TEST_CASE(sample_newton_testing)
+  {
+    // z^3-1, whose roots are the cube roots of unity
+    const int degree=3,xresolution=16,yresolution=12;
+    double coeffs[degree+1]={-1.,0.,0.,1.},roots_re[degree]={1.,-0.5,-0.5},roots_im[degree]={0.,std::sqrt(3.)/2.,-std::sqrt(3.)/2.};
+    std::vector<double> re(xresolution*yresolution),im(xresolution*yresolution);
+    std::vector<int> iterations(xresolution*yresolution),idx(xresolution*yresolution);
+
+    const int limit=sample_newton(re.data(),im.data(),iterations.data(),idx.data(),coeffs,roots_re,roots_im,50,2,degree,xresolution
+      ,yresolution,-2.,2.,-1.5,1.5,false);
+
+    // the fused root index must agree with assigning the roots afterwards
+    for (int itr=0;itr<xresolution*yresolution;++itr)
+    {
+      if (iterations[itr]==limit) { BOOST_CHECK(idx[itr]==-1); }
+      else { BOOST_CHECK(idx[itr]==closest_root(re[itr],im[itr],roots_re,roots_im,degree)); }
+    }
+  }
+
+  BOOST_AUTO_TEST_CASE(newton_root_avx2_testing)
+  {
+    if (!avx2_supported())
+    {
+      BOOST_TEST_MESSAGE("AVX2 is not supported, so the AVX2 path is not tested.");
+      return;
+    }
+
+    // z^3-1, and a quintic with complex roots, whose points are each iterated with both the general and the unrolled forms
+    double cubic[4]={-1.,0.,0.,1.},quintic[6]={2.,-3.,0.5,1.,0.,1.};
+    const double tol=1e-6;
+    const int max_itr=50;
+
+    for (const std::pair<double *,int> &poly:{std::make_pair(cubic,3),std::make_pair(quintic,5)})
+    {
+      for (double i=-2.;i<=2.;i+=0.25)
+      {
+        for (double j=-2.;j<=2.;j+=0.25)
+        {
+          int itr=0,itr_avx2=0,itr_unrolled=0;
+          const std::complex<double> root=newton_root(poly.first,&itr,std::complex<double>(i,j),poly.second,max_itr,tol);
+          double re=i,im=j,re_unrolled=i,im_unrolled=j;
+          newton_root_avx2(poly.first,&itr_avx2,&re,&im,poly.second,max_itr,tol);
+          if (poly.second==3) { newton_root_avx2<3>(poly.first,&itr_unrolled,&re_unrolled,&im_unrolled,poly.second,max_itr,tol); }
+          else { newton_root_avx2<5>(poly.first,&itr_unrolled,&re_unrolled,&im_unrolled,poly.second,max_itr,tol); }
+
+          // the same root must be reached in the same number of iterations, to within the rounding of the complex arithmetic
+          BOOST_CHECK((itr==std::numeric_limits<int>::max())==(itr_avx2==std::numeric_limits<int>::max()));
+          BOOST_CHECK(std::abs(itr-itr_avx2)<=1);
+          BOOST_CHECK(itr_avx2==itr_unrolled);
+          if (itr!=std::numeric_limits<int>::max())
+          {
+            BOOST_CHECK(std::abs(root-std::complex<double>(re,im))<tol);
+            BOOST_CHECK(std::abs(std::complex<double>(re,im)-std::complex<double>(re_unrolled,im_unrolled))<tol);
+          }
+        }
+      }
+    }
+  }
+
 BOOST_AUTO_TEST_SUITE_END()
 } // namespace NewtonTesting
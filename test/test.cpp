@@ -6,7 +6,7 @@
 // D. C. Groothuizen Dijkema - January, 2020                                                                                             //
 //+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+//
 
-// Test file for Newton's fractals
+// Test file for the Fractal project
 
 
 #include <iostream>
@@ -19,4 +19,5 @@
 #define BOOST_TEST_MODULE NEWTONTESTING
 #include <boost/test/included/unit_test.hpp>
 
+#include <test-mandelbrot.hpp>
 #include <test-newton.hpp>
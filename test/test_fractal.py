@@ -0,0 +1,45 @@
+#+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+//
+#                                                                                                                                       //
+# test_fractal.py                                                                                                                       //
+#                                                                                                                                       //
+# D. C. Groothuizen Dijkema - January, 2020                                                                                             //
+#+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+-+//
+
+# Test file for the Python helpers of the Fractal project
+# run from the root of the project, where the libraries are found, with `python -m unittest test.test_fractal`
+
+
+import unittest
+
+import numpy as np
+
+import fractal
+
+class TestPrepareIterations(unittest.TestCase):
+  '''
+  Tests of the conversion of iteration counts to values to plot.
+  '''
+  def setUp(self):
+    # a count beyond the limit, as well as counts at and below it
+    self.iterations=np.array([[0,1,100],[150,100,7]],dtype=np.intc)
+    self.limit=100
+    self.reached=self.iterations==self.limit
+
+  def test_limit_is_nan(self):
+    for log in (True,False):
+      values=fractal._prepare_iterations(self.iterations,self.limit,log)
+      self.assertTrue(np.isnan(values[self.reached]).all())
+      self.assertFalse(np.isnan(values[~self.reached]).any())
+
+  def test_log(self):
+    values=fractal._prepare_iterations(self.iterations,self.limit,True)
+    with np.errstate(divide='ignore'):
+      expected=np.log(self.iterations[~self.reached].astype(np.float32))
+    np.testing.assert_allclose(values[~self.reached],expected)
+
+  def test_log_of_floats(self):
+    values=fractal._prepare_iterations(self.iterations.astype(np.double),self.limit,True)
+    np.testing.assert_array_equal(values,fractal._prepare_iterations(self.iterations,self.limit,True))
+
+if __name__=='__main__':
+  unittest.main()